@@ -1,10 +1,11 @@
 import os, subprocess, time, logging
-import whisper
 import librosa, soundfile as sf
 import noisereduce as nr
 from pydub import AudioSegment, effects
 import numpy as np
 
+from AudioDecoding.model_registry import asr_models
+
 if not hasattr(np,'float'):
     np.float = float
 
@@ -32,6 +33,50 @@ def trim_silence(input_path, trimmed_path):
     trimmed = effects.strip_silence(audio, silence_thresh=-40)
     trimmed.export(trimmed_path, format='wav')
 
+# --- In-memory preprocessing ---
+# Same chain as the file functions above on one float32 buffer: decode once, no
+# intermediate WAVs unless debug_prefix asks for them
+def reduce_noise_array(y, sr):
+    return nr.reduce_noise(y=y, y_noise=y[0:int(sr*0.5)], sr=sr).astype(np.float32)
+
+def trim_silence_array(y, sr, silence_thresh=-40, silence_len_ms=1000, padding_ms=100):
+    # effects.strip_silence on the buffer: drop stretches of at least silence_len_ms whose
+    # RMS stays under silence_thresh dBFS, keeping padding_ms around the speech
+    ms = sr // 1000
+    n_ms = len(y) // ms
+    if n_ms < silence_len_ms:
+        return y
+    power = np.square(y[:n_ms*ms], dtype=np.float64).reshape(n_ms, ms).sum(axis=1)
+    csum = np.concatenate(([0.0], np.cumsum(power)))
+    window_rms = np.sqrt((csum[silence_len_ms:] - csum[:-silence_len_ms]) / (silence_len_ms*ms))
+    cover = np.zeros(n_ms + 1, dtype=np.int64)
+    starts = np.flatnonzero(window_rms <= 10 ** (silence_thresh / 20))
+    np.add.at(cover, starts, 1)
+    np.add.at(cover, starts + silence_len_ms, -1)
+    speech = np.cumsum(cover[:-1]) == 0
+    # Speech runs, padded and merged
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], speech, [False])).astype(np.int8)))
+    pieces, last_end = [], 0
+    for start, end in zip(edges[::2], edges[1::2]):
+        start, end = max(start - padding_ms, last_end), min(end + padding_ms, n_ms)
+        pieces.append(y[start*ms:end*ms if end < n_ms else len(y)])
+        last_end = end
+    return np.concatenate(pieces) if pieces else y[:0]
+
+def preprocess_audio(input_path, sr=16000, debug_prefix=None, trim=True):
+    """Load once, normalize -> reduce noise -> trim silence; returns (audio, sr, duration_s)
+
+    trim=False keeps the silence, so times in the buffer still match the recording.
+    With debug_prefix the intermediate buffers are written to <prefix>_norm.wav and _den.wav.
+    """
+    y, _ = librosa.load(input_path, sr=sr)
+    y = y.astype(np.float32)
+    if debug_prefix: sf.write(debug_prefix + '_norm.wav', y, sr, subtype='PCM_16')
+    y = reduce_noise_array(y, sr)
+    if debug_prefix: sf.write(debug_prefix + '_den.wav', y, sr)
+    if trim: y = trim_silence_array(y, sr)
+    return y, sr, len(y) / sr
+
 # --- Chunking ---
 def chunk_audio(path, out_dir):
     os.makedirs(out_dir, exist_ok=True)
@@ -48,19 +93,28 @@ def chunk_audio(path, out_dir):
         if end == dur_ms: break
     return chunks
 
+def chunk_audio_array(y, sr, chunk_s=30, step_s=25):
+    # Same windows as chunk_audio as views into the buffer: no copies, no files
+    chunks = []
+    for start in range(0, len(y), step_s*sr):
+        end = min(start + chunk_s*sr, len(y))
+        chunks.append(y[start:end])
+        if end == len(y): break
+    return chunks
+
 # --- Transcription ---
-def transcribe_with_retries(chunk_paths):
-    model = whisper.load_model('base')
+def transcribe_with_retries(chunks, model_size='base'):
+    # chunks are WAV paths or 16 kHz float32 arrays (passed to Whisper without ffmpeg)
     transcripts, confs = [], []
-    for path in chunk_paths:
+    for i, chunk in enumerate(chunks):
         for attempt in range(3):
             try:
-                res = model.transcribe(path, fp16=False)
+                res = asr_models.transcribe(model_size, chunk, fp16=False)
                 transcripts.append(res['text'].strip())
                 confs.append(res['segments'][-1]['avg_logprob'])
                 break
             except Exception as e:
-                logging.warning(f"Whisper error on {path}: {e}")
+                logging.warning(f"Whisper error on chunk {i}: {e}")
                 time.sleep(1)
         else:
             transcripts.append('')
@@ -103,8 +157,9 @@ def speech_rate_wpm(text, duration_s):
         return 0.0  # Avoid ZeroDivisionError
     return round(len(text.split())/(duration_s/60), 2)
 
-def estimate_pitch(audio_path):
-    y, sr = librosa.load(audio_path, sr=16000)
+def estimate_pitch(audio, sr=16000):
+    # audio is a file path or a float32 array at sr
+    y = librosa.load(audio, sr=sr)[0] if isinstance(audio, str) else audio
     pitches, mags = librosa.piptrack(y=y, sr=sr)
     vals = pitches[mags > np.median(mags)]
     return float(np.median(vals)) if len(vals) > 0 else 0.0
@@ -114,18 +169,22 @@ def vocal_confidence(pitch_vals, rate_wpm):
     rate_var = abs(rate_wpm - 130)
     return max(0, round(1 - (var/1000 + rate_var/200), 2))
 
-def aggregate_verbal(question, transcript, duration_s, audio_chunks_dir):
+def aggregate_verbal(question, transcript, duration_s, audio_chunks_dir=None, audio_chunks=None):
+    # Pitch comes from the first chunk: audio_chunks (arrays) or a file in audio_chunks_dir
     rel = score_relevance(question, transcript)
     cla = score_clarity(transcript)
     fillers = count_fillers(transcript)
     filler_ratio = sum(fillers.values()) / max(1, len(transcript.split()))
     rate = speech_rate_wpm(transcript, duration_s)
 
-    chunk_files = os.listdir(audio_chunks_dir)
-    if not chunk_files:
-        pitch = 0.0
+    if audio_chunks is not None:
+        pitch = estimate_pitch(audio_chunks[0]) if len(audio_chunks) > 0 and len(audio_chunks[0]) > 0 else 0.0
     else:
-        pitch = estimate_pitch(os.path.join(audio_chunks_dir, chunk_files[0]))
+        chunk_files = os.listdir(audio_chunks_dir)
+        if not chunk_files:
+            pitch = 0.0
+        else:
+            pitch = estimate_pitch(os.path.join(audio_chunks_dir, chunk_files[0]))
 
     confid = vocal_confidence([pitch], rate)
     tone = estimate_tone_from_features(rate, filler_ratio)
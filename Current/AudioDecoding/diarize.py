@@ -1,30 +1,118 @@
 import os
-import tempfile
-import whisper
+import time
+import wave
+import threading
+import numpy as np
 from pydub import AudioSegment
-from pyannote.audio import Pipeline
 
-def diarize_audio(audio_path, hf_token):
-    if not hf_token:
-        raise ValueError("Missing Hugging Face token for diarization.")
+from AudioDecoding.model_registry import asr_models
 
-    print(f"[DEBUG] Starting diarization on: {audio_path}")
+PYANNOTE_MODEL = "pyannote/speaker-diarization@2.1"
+
+def load_pyannote_pipeline(model_path=None, hf_token=None):
+    """pyannote pipeline as a callable returning (start, end, speaker) turns
+
+    model_path points at a local copy of the pipeline (its config.yaml); without one
+    the pipeline is downloaded from the Hugging Face hub, which needs a token.
+    """
+    from pyannote.audio import Pipeline
+
+    if model_path and os.path.exists(model_path):
+        pipeline = Pipeline.from_pretrained(model_path)
+    else:
+        if not hf_token:
+            raise ValueError("Missing Hugging Face token for diarization.")
+        pipeline = Pipeline.from_pretrained(PYANNOTE_MODEL, use_auth_token=hf_token)
+
+    def run(audio, sr):
+        if isinstance(audio, np.ndarray):
+            # In-memory input: (channel, time) waveform, no file read
+            import torch
+            audio = {'waveform': torch.from_numpy(audio).reshape(1, -1), 'sample_rate': sr}
+        diarization = pipeline(audio)
+        return [(turn.start, turn.end, speaker)
+                for turn, _, speaker in diarization.itertracks(yield_label=True)]
+    return run
+
+def stub_pipeline(audio, sr):
+    """Offline stand-in needing no weights: one speaker over the whole recording"""
+    if isinstance(audio, np.ndarray):
+        duration = len(audio) / sr
+    else:
+        with wave.open(audio, 'rb') as f:
+            duration = f.getnframes() / f.getframerate()
+    return [(0.0, duration, "SPEAKER_00")] if duration > 0 else []
+
+class DiarizationService:
+    """Diarization pipeline loaded once and shared by every session
+
+    backend is 'pyannote' or 'stub'. At most max_concurrent sessions run the
+    pipeline at a time; the others wait instead of loading copies of their own.
+    """
+
+    def __init__(self, backend='pyannote', model_path=None, hf_token=None, max_concurrent=1):
+        self.backend = backend
+        self.model_path = model_path
+        self.hf_token = hf_token
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(max_concurrent)
+        self.pipeline = None
+        self.load_seconds = None
+
+    def configure(self, backend=None, model_path=None, max_concurrent=None):
+        """Change the settings; the pipeline is reloaded on next use"""
+        with self.lock:
+            if backend is not None:
+                self.backend = backend
+            if model_path is not None:
+                self.model_path = model_path
+            if max_concurrent is not None:
+                self.slots = threading.Semaphore(max_concurrent)
+            self.pipeline = None
+
+    def load(self):
+        with self.lock:
+            if self.pipeline is None:
+                start = time.perf_counter()
+                if self.backend == 'stub':
+                    self.pipeline = stub_pipeline
+                elif self.backend == 'pyannote':
+                    self.pipeline = load_pyannote_pipeline(self.model_path, self.hf_token)
+                else:
+                    raise ValueError(f"Unknown diarization backend: {self.backend}")
+                self.load_seconds = round(time.perf_counter() - start, 3)
+                print(f"Diarization pipeline '{self.backend}' loaded in {self.load_seconds}s")
+            return self.pipeline
+
+    def diarize(self, audio, sr=16000):
+        """(start, end, speaker) turns of a WAV path or a float32 array at sr"""
+        pipeline = self.load()
+        with self.slots:
+            return pipeline(audio, sr)
+
+# Shared by every session in this process
+diarization_service = DiarizationService()
+
+def diarize_audio(audio, hf_token=None, sr=16000):
+    if hf_token and not diarization_service.hf_token:
+        diarization_service.hf_token = hf_token
+
+    source = f"{len(audio) / sr:.2f}s buffer" if isinstance(audio, np.ndarray) else audio
+    print(f"[DEBUG] Starting diarization on: {source}")
     try:
-        pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization@2.1",
-            use_auth_token=hf_token
-        )
-        diarization = pipeline(audio_path)
+        turns = diarization_service.diarize(audio, sr)
+    except ValueError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Diarization failed: {e}")
 
     segments = []
-    for turn, _, speaker in diarization.itertracks(yield_label=True):
-        print(f"[SEGMENT] Speaker: {speaker} | Start: {turn.start:.2f}s | End: {turn.end:.2f}s")
+    for start, end, speaker in turns:
+        print(f"[SEGMENT] Speaker: {speaker} | Start: {start:.2f}s | End: {end:.2f}s")
         segments.append({
             "speaker": speaker,
-            "start": turn.start,
-            "end": turn.end
+            "start": start,
+            "end": end
         })
 
     return segments
@@ -40,23 +128,38 @@ def extract_segments(audio_path, segments):
         speaker_audio[speaker] = speaker_audio.get(speaker, AudioSegment.empty()) + chunk
     return speaker_audio
 
+def extract_segment_arrays(y, sr, segments):
+    """Speaker -> float32 audio of its turns, sliced from the buffer by sample offsets
+
+    A speaker with a single turn gets a view of y; several turns are joined in one copy.
+    """
+    turns = {}
+    for seg in segments:
+        turns.setdefault(seg["speaker"], []).append(y[int(seg["start"] * sr):int(seg["end"] * sr)])
+    return {speaker: parts[0] if len(parts) == 1 else np.concatenate(parts)
+            for speaker, parts in turns.items()}
+
+def segment_to_array(audio):
+    """pydub AudioSegment as the 16 kHz mono float32 array Whisper takes"""
+    audio = audio.set_frame_rate(16000).set_channels(1)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    return samples / float(1 << (8 * audio.sample_width - 1))
+
 def transcribe_speaker_chunks(speaker_audio, model_size="base"):
-    model = whisper.load_model(model_size)
+    # Values are float32 arrays at 16 kHz or AudioSegments; Whisper gets arrays, so no
+    # temporary WAV is written and decoded again by ffmpeg
     results = {}
 
     for speaker, audio in speaker_audio.items():
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            temp_path = temp_file.name
-            audio.export(temp_path, format="wav")
+        if isinstance(audio, AudioSegment):
+            audio = segment_to_array(audio)
 
         print(f"[TRANSCRIBE] Transcribing audio for {speaker}...")
         try:
-            result = model.transcribe(temp_path, fp16=False)
+            result = asr_models.transcribe(model_size, np.ascontiguousarray(audio, dtype=np.float32), fp16=False)
             results[speaker] = result["text"].strip()
         except Exception as e:
             print(f"[ERROR] Whisper failed on {speaker}: {e}")
             results[speaker] = ""
-        finally:
-            os.remove(temp_path)
 
     return results
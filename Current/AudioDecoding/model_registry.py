@@ -0,0 +1,138 @@
+# Process-wide registry of loaded Whisper models
+#
+# transcribe_with_retries and transcribe_speaker_chunks used to call
+# whisper.load_model on every call, so each interview paid the model load (seconds,
+# plus hundreds of MB allocated and freed again) twice. The registry loads each model
+# size once per process and shares it across sessions. With several sizes configured,
+# the least recently used models are dropped when their weights exceed the memory
+# budget. Load and first-inference times are recorded per size.
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import whisper
+
+# Approximate fp32 weight size per model, used to make room before a load
+MODEL_BYTES_ESTIMATE = {
+    'tiny': 39 * 4 * 1000 ** 2,
+    'base': 74 * 4 * 1000 ** 2,
+    'small': 244 * 4 * 1000 ** 2,
+    'medium': 769 * 4 * 1000 ** 2,
+    'large': 1550 * 4 * 1000 ** 2
+}
+WARM_UP_SECONDS = 1  # Silent audio transcribed once so the first request skips lazy setup
+
+
+def model_bytes(model):
+    """Bytes held by the model's parameters and buffers"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def estimate_bytes(size):
+    return MODEL_BYTES_ESTIMATE.get(size.split('.')[0].split('-')[0], MODEL_BYTES_ESTIMATE['large'])
+
+
+class ModelRegistry:
+    """Loads Whisper models once per process and evicts the least recently used"""
+
+    def __init__(self, max_bytes=None, device=None):
+        self.max_bytes = max_bytes  # None = keep every loaded size
+        self.device = device
+        self.lock = threading.Lock()
+        self.models = OrderedDict()  # Size -> (model, bytes, transcribe lock), LRU first
+        self.loading = {}  # Size -> event set once a load in progress finishes
+        self.stats = {}
+
+    def size_stats(self, size):
+        return self.stats.setdefault(size, {
+            'loads': 0, 'hits': 0, 'evictions': 0, 'bytes': 0,
+            'load_seconds': None, 'first_inference_seconds': None
+        })
+
+    def evict_for(self, needed_bytes):
+        """Drop least recently used models until needed_bytes fit (lock held)"""
+        if self.max_bytes is None:
+            return
+        used = sum(entry[1] for entry in self.models.values())
+        while self.models and used + needed_bytes > self.max_bytes:
+            size, (_, size_bytes, _) = self.models.popitem(last=False)
+            used -= size_bytes
+            self.size_stats(size)['evictions'] += 1
+            print(f"ASR model '{size}' evicted ({size_bytes / 1024 ** 2:.0f} MB)")
+
+    def get(self, size):
+        """(model, transcribe lock) for the size, loading it on first use"""
+        while True:
+            with self.lock:
+                if size in self.models:
+                    self.models.move_to_end(size)
+                    self.size_stats(size)['hits'] += 1
+                    model, _, model_lock = self.models[size]
+                    return model, model_lock
+                event = self.loading.get(size)
+                if event is None:
+                    # This thread loads; others asking for the size wait for it
+                    event = self.loading[size] = threading.Event()
+                    self.evict_for(estimate_bytes(size))
+                    break
+            event.wait()
+
+        try:
+            start = time.perf_counter()
+            model = whisper.load_model(size, device=self.device)
+            load_seconds = time.perf_counter() - start
+            size_bytes = model_bytes(model)
+            with self.lock:
+                self.evict_for(size_bytes)
+                model_lock = threading.Lock()
+                self.models[size] = (model, size_bytes, model_lock)
+                stats = self.size_stats(size)
+                stats['loads'] += 1
+                stats['bytes'] = size_bytes
+                stats['load_seconds'] = round(load_seconds, 3)
+            print(f"ASR model '{size}' loaded in {load_seconds:.2f}s ({size_bytes / 1024 ** 2:.0f} MB)")
+            return model, model_lock
+        finally:
+            with self.lock:
+                self.loading.pop(size).set()
+
+    def transcribe(self, size, audio, **options):
+        """model.transcribe with the shared model of the size
+
+        Decoding installs hooks on the model, so calls on one model are serialized.
+        """
+        model, model_lock = self.get(size)
+        with model_lock:
+            start = time.perf_counter()
+            result = model.transcribe(audio, **options)
+            elapsed = time.perf_counter() - start
+        with self.lock:
+            stats = self.size_stats(size)
+            if stats['first_inference_seconds'] is None:
+                stats['first_inference_seconds'] = round(elapsed, 3)
+        return result
+
+    def warm_up(self, sizes):
+        """Load the sizes and run one inference each, ahead of the first interview"""
+        silence = np.zeros(whisper.audio.SAMPLE_RATE * WARM_UP_SECONDS, dtype=np.float32)
+        for size in sizes:
+            try:
+                self.transcribe(size, silence, fp16=False)
+            except Exception as e:
+                print(f"ASR model '{size}' warm-up failed: {e}")
+        return self.metrics()
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'loaded': list(self.models),
+                'loaded_bytes': sum(entry[1] for entry in self.models.values()),
+                'max_bytes': self.max_bytes,
+                'sizes': {size: dict(stats) for size, stats in self.stats.items()}
+            }
+
+
+# Shared by every session in this process
+asr_models = ModelRegistry()
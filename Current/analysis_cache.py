@@ -0,0 +1,133 @@
+# Content-addressed cache for interview analysis results
+#
+# Entries are keyed by a streaming SHA-256 of the recording bytes plus the analyzer
+# version and parameters, so re-uploads and re-runs of the same recording reuse the
+# stored eye_analysis.json / audio_analysis.json instead of analyzing again.
+# Each entry is a directory holding copies of the result files; the least recently
+# used entries are evicted once the cache grows past its size limit.
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Bytes read per hash update
+
+
+def file_digest(path, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 of a file, read in chunks so large recordings are never fully loaded"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def cache_key(kind, content_digest, version, params=None):
+    """Key for one analysis of one recording"""
+    description = json.dumps({
+        'kind': kind,
+        'content': content_digest,
+        'version': version,
+        'params': params or {}
+    }, sort_keys=True, default=str)
+    return f"{kind}-{hashlib.sha256(description.encode('utf-8')).hexdigest()}"
+
+
+def recording_cache_key(kind, path, version, params=None):
+    """Cache key for analyzing the recording at path; None (no caching) when it cannot be read"""
+    try:
+        return cache_key(kind, file_digest(path), version, params)
+    except OSError as e:
+        print(f"Analysis cache disabled for {path}: {e}")
+        return None
+
+
+class AnalysisCache:
+    """On-disk result cache with size-bounded LRU eviction"""
+
+    META_FILE = 'cache_entry.json'
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key, output_dir, result_file):
+        """Copy a cached entry into output_dir and return the parsed result_file, or None on a miss"""
+        if key is None:
+            return None
+        entry_dir = self.entry_dir(key)
+        with self.lock:
+            if not os.path.isdir(entry_dir):
+                return None
+            try:
+                with open(os.path.join(entry_dir, self.META_FILE), 'r') as f:
+                    files = json.load(f)['files']
+                for filename in files:
+                    shutil.copy2(os.path.join(entry_dir, filename), os.path.join(output_dir, filename))
+                # Entry mtime doubles as the last access time for eviction
+                os.utime(entry_dir)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Discarding unreadable cache entry {key}: {e}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+
+        with open(os.path.join(output_dir, result_file), 'r') as f:
+            return json.load(f)
+
+    def store(self, key, source_dir, filenames):
+        """Copy result files from source_dir into the cache under key"""
+        files = [name for name in filenames if os.path.exists(os.path.join(source_dir, name))]
+        if key is None or not files:
+            return False
+
+        # Build the entry beside the cache and rename it into place, so readers
+        # never see a half-written entry
+        staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=self.cache_dir)
+        try:
+            for filename in files:
+                shutil.copy2(os.path.join(source_dir, filename), os.path.join(staging_dir, filename))
+            with open(os.path.join(staging_dir, self.META_FILE), 'w') as f:
+                json.dump({'key': key, 'files': files, 'stored_at': time.time()}, f)
+
+            with self.lock:
+                entry_dir = self.entry_dir(key)
+                if os.path.isdir(entry_dir):
+                    shutil.rmtree(entry_dir)
+                os.rename(staging_dir, entry_dir)
+                self.evict()
+            return True
+        except OSError as e:
+            print(f"Could not cache analysis {key}: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return False
+
+    def entry_size(self, entry_dir):
+        return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes (lock held)"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                entries.append((entry.stat().st_mtime, self.entry_size(entry.path), entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        return total
@@ -0,0 +1,132 @@
+# Low-resolution analysis proxy for uploaded recordings
+#
+# Right after upload, ffmpeg transcodes the recording into a small proxy holding only
+# the frames the eye tracker samples, scaled to the analysis width and converted to
+# gray. MJPEG is intra-only, so seeks are exact, and lossy, so the proxy stays well
+# below the original's size (lossless FFV1 at analysis width was 1.5-3x the upload).
+# Detections differ slightly from a direct decode: within about a point of cheating
+# score on webcam-framed recordings, more for faces near the 60px minimum, whose eyes
+# the quantization can hide. The original stays untouched for playback.
+# The eye tracker then decodes the proxy instead of the original, so its decode
+# cost no longer depends on what resolution the browser sent.
+import os
+import json
+import time
+import subprocess
+import threading
+from datetime import datetime
+
+from frame_sources import probe_video, analysis_size
+from recording_index import load_recording_index
+
+PROXY_SUFFIX = '_analysis_proxy.avi'
+PROXY_INFO_SUFFIX = '_analysis_proxy.json'
+# Intra-only JPEG frames; q 4 kept the detections closest to lossless of the lossy
+# settings tried (H.264 intra at CRF 18-23 was smaller but blurred the eyes more)
+PROXY_CODEC_ARGS = ['-c:v', 'mjpeg', '-q:v', '4', '-pix_fmt', 'yuvj420p']
+
+
+def proxy_paths(video_path):
+    """(proxy video path, proxy info path) for a recording"""
+    base = os.path.splitext(video_path)[0]
+    return base + PROXY_SUFFIX, base + PROXY_INFO_SUFFIX
+
+
+def create_analysis_proxy(video_path, frame_step=3, max_width=640, ffmpeg_bin='ffmpeg'):
+    """Transcode the analysis proxy of a recording and return its info
+
+    The proxy frame n (0-based) is source frame (n + 1) * frame_step - 1, i.e. the
+    frames the tracker samples, at the size analyze_frame would resize them to.
+    """
+    proxy_path, info_path = proxy_paths(video_path)
+    source_width, source_height, source_fps, source_total_frames = probe_video(video_path)
+    # The container header of MediaRecorder uploads has no usable frame count
+    index = load_recording_index(video_path, with_frames=False)
+    if index is not None:
+        source_fps, source_total_frames = index['fps'], index['frame_count']
+    if source_width <= 0 or source_height <= 0:
+        raise Exception("Could not determine video resolution")
+    width, height, scale_factor = analysis_size(source_width, source_height, max_width)
+    fps = source_fps if source_fps > 0 else 24
+    proxy_fps = fps / frame_step
+
+    start = time.perf_counter()
+    partial_path = proxy_path + '.partial.avi'
+    command = [
+        ffmpeg_bin, '-nostdin', '-loglevel', 'error', '-y', '-i', video_path, '-an', '-sn',
+        # Same sampling grid as the frame sources, renumbered to a constant rate
+        '-vf', (f"select='eq(mod(n\\,{frame_step})\\,{frame_step - 1})',setpts=N/({proxy_fps:.6f}*TB),"
+                f"scale={width}:{height}:flags=bilinear,format=gray"),
+        '-r', f"{proxy_fps:.6f}"
+    ] + PROXY_CODEC_ARGS + [partial_path]
+    try:
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise Exception("ffmpeg not found - cannot create analysis proxy")
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise Exception(f"Proxy transcode failed: {e.stderr.decode(errors='replace').strip()}")
+    os.replace(partial_path, proxy_path)
+
+    _, _, _, proxy_frames = probe_video(proxy_path)
+    info = {
+        'source_file': os.path.basename(video_path),
+        'source_size': os.path.getsize(video_path),
+        'source_width': source_width,
+        'source_height': source_height,
+        'source_fps': fps,
+        'source_total_frames': source_total_frames,
+        'frame_step': frame_step,
+        'width': width,
+        'height': height,
+        'scale_factor': scale_factor,
+        'proxy_file': os.path.basename(proxy_path),
+        'codec': 'mjpeg',
+        'proxy_frames': proxy_frames,
+        'proxy_size': os.path.getsize(proxy_path),
+        'transcode_seconds': round(time.perf_counter() - start, 2),
+        'created_at': datetime.now().isoformat()
+    }
+    # The info file is written last; a proxy without it is never used
+    with open(info_path, 'w') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def load_proxy_info(video_path, frame_step=3):
+    """Info of a complete, up-to-date proxy usable at the frame step, else None
+
+    A proxy serves any multiple of the step it was created with.
+    """
+    proxy_path, info_path = proxy_paths(video_path)
+    if not os.path.exists(info_path) or not os.path.exists(proxy_path):
+        return None
+    try:
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # A re-uploaded recording invalidates the proxy
+    proxy_step = info.get('frame_step')
+    if not proxy_step or frame_step % proxy_step != 0 or info.get('source_size') != os.path.getsize(video_path):
+        return None
+    info['path'] = proxy_path
+    return info
+
+
+def start_analysis_proxy(video_path, frame_step=3, max_width=640):
+    """Create the proxy in a background thread; join the returned thread before analyzing"""
+    def proxy_thread():
+        try:
+            info = create_analysis_proxy(video_path, frame_step, max_width)
+            print(f"Analysis proxy ready: {info['width']}x{info['height']}, {info['proxy_frames']} frames "
+                  f"in {info['transcode_seconds']}s")
+        except Exception as e:
+            print(f"Analysis proxy not created, analyzing the original: {e}")
+
+    thread = threading.Thread(target=proxy_thread)
+    thread.daemon = True
+    thread.start()
+    return thread
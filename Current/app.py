@@ -9,10 +9,19 @@ from werkzeug.utils import secure_filename
 import cv2
 import numpy as np
 import subprocess
+import shutil
 import threading
 import time
 import random
 from integration import run_audio_processing
+from AudioDecoding.model_registry import asr_models
+from AudioDecoding.diarize import diarization_service
+from eye_tracking import OptimizedEyeTracker, EYE_ANALYSIS_VERSION, EYE_RESULT_FILES, range_core_count
+from analysis_cache import AnalysisCache, recording_cache_key
+from analysis_proxy import start_analysis_proxy
+from recording_index import prepare_recording_index
+from live_eye_analysis import IncrementalEyeAnalysis
+from eye_worker_pool import EyeWorkerPool
 
 app = Flask(__name__)
 app.secret_key = 'ai_interviewer_secret_key_2025'  # Change this in production
@@ -21,11 +30,62 @@ app.secret_key = 'ai_interviewer_secret_key_2025'  # Change this in production
 BASE_DIR = 'AI-Interviewer'
 LOGIN_DETAILS_CSV = os.path.join(BASE_DIR, 'logindetails.csv')
 USERS_FOLDER = os.path.join(BASE_DIR, 'Users')
+EYE_ANALYSIS_WORKERS = os.cpu_count() or 1  # Processes used to analyze one recording
+EYE_FRAME_SOURCE = 'ffmpeg' if shutil.which('ffmpeg') else 'opencv'  # Decoder feeding the eye tracker
+EYE_FACE_TRACKING = True  # Track the face between periodic cascade detections
+EYE_SEARCH_WINDOW = True  # Search near the previous face before scanning the whole frame
+EYE_ADAPTIVE_SAMPLING = False  # Full analysis only around motion, sparse while the scene is static (off until its scores match dense analysis)
+EYE_PIPELINE_THREADS = 2  # Detection threads fed by a separate decode thread (0 = serial decode/detect)
+EYE_COARSE_TO_FINE = False  # Long recordings: sparse pass first, dense analysis only in flagged windows
+EYE_TIME_BUDGET = None  # Seconds the recorded-video eye analysis may take; settings degrade to fit (None = unlimited, the default until degraded scores are validated against full analysis)
+EYE_DETECTOR = 'haar'  # Face detector backend: haar, lbp, yunet or res10 (see benchmarks/bench_detectors.py)
+LIVE_EYE_ANALYSIS = shutil.which('ffmpeg') is not None  # Analyze recording chunks while the interview runs
+# Transcode a small gray proxy at upload and analyze that. Disk cost: one MJPEG frame
+# per sampled frame at analysis width, kept next to the original for re-analyses -
+# about 0.4x a webcam-framed 720p MediaRecorder upload, up to about 1.2x for uploads
+# VP8 compresses unusually well (static, distant scenes)
+EYE_ANALYSIS_PROXY = shutil.which('ffmpeg') is not None
+EYE_SEEKABLE_INDEX = shutil.which('ffmpeg') is not None  # Remux uploads into a seekable copy with a frame index
+LIVE_ANALYSIS_DRAIN_TIMEOUT = 300  # Seconds a progressing live analysis may take to catch up after upload
+LIVE_ANALYSIS_STALL_TIMEOUT = 15  # Seconds without an analyzed frame before falling back to the full analysis
+LIVE_ANALYSIS_IDLE_TIMEOUT = 900  # Live analyses without a chunk for this long are stopped (abandoned sessions)
+# Live detection runs on reader threads of this process, outside the worker pool; sessions
+# beyond the cap get the full analysis after upload instead
+LIVE_ANALYSIS_MAX_SESSIONS = max(1, (os.cpu_count() or 1) // 2)
+LIVE_ANALYSIS_OPENCV_THREADS = 1  # OpenCV threads of this process (each live detection uses one core)
+# Warm worker processes shared by all interviews; each runs its detection threads with
+# one OpenCV thread next to a decode thread and, for the ffmpeg source, an ffmpeg
+# subprocess, so the cores are divided by all three (face tracking or the search window
+# limit the pipeline to a single detection thread)
+EYE_RANGE_CORES = range_core_count(EYE_PIPELINE_THREADS, EYE_FACE_TRACKING, EYE_SEARCH_WINDOW, EYE_FRAME_SOURCE)
+EYE_POOL_PROCESSES = max(1, (os.cpu_count() or 1) // EYE_RANGE_CORES)
+EYE_POOL_OPENCV_THREADS = 1
+ANALYSIS_CACHE_DIR = os.path.join(BASE_DIR, 'analysis_cache')  # Results of previously analyzed recordings
+ANALYSIS_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Least recently used results are evicted beyond this size
+ASR_MODEL_SIZE = 'base'  # Whisper model that transcribes the interviews
+ASR_MODEL_SIZES = [ASR_MODEL_SIZE]  # Whisper models loaded and warmed at startup
+ASR_MODEL_MAX_BYTES = 2 * 1024 ** 3  # Least recently used Whisper models are unloaded beyond this size
+DIARIZATION_BACKEND = 'pyannote'  # 'stub' runs without model weights (single speaker, offline testing)
+DIARIZATION_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'speaker-diarization', 'config.yaml')  # Local pipeline copy; hub download if missing
+DIARIZATION_MAX_CONCURRENT = 1  # Sessions running the shared diarization pipeline at once
+AUDIO_KEEP_INTERMEDIATE = False  # Debug: write the normalized, denoised and trimmed WAVs of each session
+AUDIO_SEGMENTATION = 'timings'  # Answer windows from question_timings; 'diarization' runs pyannote for multi-speaker recordings
 
 # Create necessary directories
 os.makedirs(BASE_DIR, exist_ok=True)
 os.makedirs(USERS_FOLDER, exist_ok=True)
 
+# Identical recordings (client retries, re-runs) reuse earlier analysis results
+analysis_cache = AnalysisCache(ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES)
+
+# Recorded-video eye analysis runs on these workers (processes start on first use)
+eye_worker_pool = EyeWorkerPool(EYE_POOL_PROCESSES, EYE_POOL_OPENCV_THREADS)
+
+# Whisper models are loaded once and shared by every session's audio analysis
+asr_models.max_bytes = ASR_MODEL_MAX_BYTES
+# The diarization pipeline is loaded on first use and shared the same way
+diarization_service.configure(DIARIZATION_BACKEND, DIARIZATION_MODEL_PATH, DIARIZATION_MAX_CONCURRENT)
+
 # Initialize login details CSV if it doesn't exist
 if not os.path.exists(LOGIN_DETAILS_CSV):
     with open(LOGIN_DETAILS_CSV, 'w', newline='', encoding='utf-8') as f:
@@ -88,339 +148,6 @@ def get_user_info(username):
                 }
     return None
 
-class OptimizedEyeTracker:
-    def __init__(self):
-        # Initialize OpenCV classifiers
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        
-        # Optimized tracking parameters for 24 FPS
-        self.prev_face_center = None
-        self.prev_eye_centers = None
-        self.face_movement_threshold = 25  # Slightly higher for 24 FPS
-        self.eye_movement_threshold = 18   # Adjusted for lower frame rate
-        
-        # Frame analysis optimization
-        self.analysis_frame_skip = 3  # Analyze every 3rd frame (8 FPS effective analysis)
-        
-    def get_center(self, rect):
-        """Get center point of rectangle"""
-        x, y, w, h = rect
-        return (x + w // 2, y + h // 2)
-    
-    def calculate_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        if point1 is None or point2 is None:
-            return 0
-        return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
-    
-    def detect_eye_in_face(self, face_roi):
-        """Detect eyes within a face region - optimized for performance"""
-        eyes = self.eye_cascade.detectMultiScale(
-            face_roi, 
-            scaleFactor=1.15,  # Slightly larger steps for performance
-            minNeighbors=4,    # Reduced for faster detection
-            minSize=(12, 12),  # Slightly larger minimum
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        return eyes
-    
-    def analyze_frame(self, frame):
-        """Analyze a single frame for face and eye detection - optimized"""
-        # Resize frame for faster processing (optional)
-        height, width = frame.shape[:2]
-        if width > 640:
-            scale_factor = 640 / width
-            new_width = int(width * scale_factor)
-            new_height = int(height * scale_factor)
-            frame = cv2.resize(frame, (new_width, new_height))
-        else:
-            scale_factor = 1.0
-        
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Optimize face detection parameters
-        faces = self.face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.15,
-            minNeighbors=4,
-            minSize=(60, 60),  # Larger minimum for performance
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        
-        analysis_result = {
-            'faces_detected': len(faces),
-            'face_movement': 0,
-            'eye_movement': 0,
-            'looking_away': False,
-            'eyes_detected': 0,
-            'frame_scale': scale_factor
-        }
-        
-        if len(faces) > 0:
-            # Use the largest face (most likely the main subject)
-            face = max(faces, key=lambda f: f[2] * f[3])
-            x, y, w, h = face
-            
-            # Adjust coordinates back to original scale
-            if scale_factor != 1.0:
-                x = int(x / scale_factor)
-                y = int(y / scale_factor)
-                w = int(w / scale_factor)
-                h = int(h / scale_factor)
-            
-            # Calculate face center
-            face_center = self.get_center((x, y, w, h))
-            
-            # Calculate face movement
-            if self.prev_face_center is not None:
-                face_movement = self.calculate_distance(face_center, self.prev_face_center)
-                analysis_result['face_movement'] = face_movement
-                
-                # Detect if face moved significantly (potential looking away)
-                if face_movement > self.face_movement_threshold:
-                    analysis_result['looking_away'] = True
-            
-            self.prev_face_center = face_center
-            
-            # Detect eyes within the face region
-            face_roi_y1 = max(0, int(y * scale_factor))
-            face_roi_y2 = min(gray.shape[0], int((y + h) * scale_factor))
-            face_roi_x1 = max(0, int(x * scale_factor))
-            face_roi_x2 = min(gray.shape[1], int((x + w) * scale_factor))
-            
-            face_roi = gray[face_roi_y1:face_roi_y2, face_roi_x1:face_roi_x2]
-            
-            if face_roi.size > 0:
-                eyes = self.detect_eye_in_face(face_roi)
-                analysis_result['eyes_detected'] = len(eyes)
-                
-                # Analyze eye movement if eyes are detected
-                if len(eyes) >= 2:
-                    # Sort eyes by x-coordinate to get left and right eye
-                    eyes = sorted(eyes, key=lambda e: e[0])
-                    
-                    # Take the two most prominent eyes
-                    eye_centers = []
-                    for eye in eyes[:2]:
-                        ex, ey, ew, eh = eye
-                        # Convert eye coordinates back to full frame coordinates
-                        eye_center_x = face_roi_x1 + ex + ew//2
-                        eye_center_y = face_roi_y1 + ey + eh//2
-                        
-                        if scale_factor != 1.0:
-                            eye_center_x = int(eye_center_x / scale_factor)
-                            eye_center_y = int(eye_center_y / scale_factor)
-                        
-                        eye_centers.append((eye_center_x, eye_center_y))
-                    
-                    # Calculate eye movement
-                    if self.prev_eye_centers is not None and len(self.prev_eye_centers) == len(eye_centers):
-                        total_eye_movement = 0
-                        for i, (current, previous) in enumerate(zip(eye_centers, self.prev_eye_centers)):
-                            movement = self.calculate_distance(current, previous)
-                            total_eye_movement += movement
-                        
-                        avg_eye_movement = total_eye_movement / len(eye_centers)
-                        analysis_result['eye_movement'] = avg_eye_movement
-                        
-                        # Detect significant eye movement
-                        if avg_eye_movement > self.eye_movement_threshold:
-                            analysis_result['looking_away'] = True
-                    
-                    self.prev_eye_centers = eye_centers
-                else:
-                    # If eyes are not detected, consider it as looking away
-                    analysis_result['looking_away'] = True
-                    self.prev_eye_centers = None
-        else:
-            # No face detected - definitely looking away
-            analysis_result['looking_away'] = True
-            self.prev_face_center = None
-            self.prev_eye_centers = None
-        
-        return analysis_result
-    
-    def analyze_video_for_cheating(self, video_path, output_dir):
-        """Analyze 24 FPS video for eye movement and detect potential cheating"""
-        try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise Exception("Could not open video file")
-            
-            # Video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            # Tracking variables
-            frame_count = 0
-            looking_away_frames = 0
-            total_analyzed_frames = 0
-            no_face_frames = 0
-            
-            suspicious_movements = []
-            detailed_analysis = []
-            
-            print(f"Starting optimized video analysis: {total_frames} frames at {fps:.1f} FPS, {duration:.2f} seconds")
-            
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                
-                # Optimized frame analysis - analyze every 3rd frame for 24 FPS (effective 8 FPS analysis)
-                if frame_count % self.analysis_frame_skip != 0:
-                    continue
-                
-                total_analyzed_frames += 1
-                
-                # Analyze current frame
-                frame_analysis = self.analyze_frame(frame)
-                timestamp = frame_count / fps if fps > 0 else frame_count
-                
-                # Record detailed analysis (sample for efficiency)
-                frame_analysis['timestamp'] = timestamp
-                frame_analysis['frame_number'] = frame_count
-                
-                # Only store every 10th analysis for memory efficiency
-                if total_analyzed_frames % 10 == 0:
-                    detailed_analysis.append(frame_analysis)
-                
-                # Count suspicious behavior
-                if frame_analysis['looking_away']:
-                    looking_away_frames += 1
-                    
-                    # Record significant movements
-                    if (frame_analysis['face_movement'] > self.face_movement_threshold or 
-                        frame_analysis['eye_movement'] > self.eye_movement_threshold or
-                        frame_analysis['faces_detected'] == 0):
-                        
-                        movement_data = {
-                            'timestamp': timestamp,
-                            'face_movement': frame_analysis['face_movement'],
-                            'eye_movement': frame_analysis['eye_movement'],
-                            'faces_detected': frame_analysis['faces_detected'],
-                            'eyes_detected': frame_analysis['eyes_detected'],
-                            'type': 'suspicious_behavior'
-                        }
-                        suspicious_movements.append(movement_data)
-                
-                if frame_analysis['faces_detected'] == 0:
-                    no_face_frames += 1
-                
-                # Progress indicator (less frequent for performance)
-                if total_analyzed_frames % 50 == 0:
-                    progress = (frame_count / total_frames) * 100
-                    print(f"Analysis progress: {progress:.1f}% ({total_analyzed_frames} frames analyzed)")
-            
-            cap.release()
-            
-            # Calculate metrics
-            if total_analyzed_frames > 0:
-                looking_away_percentage = (looking_away_frames / total_analyzed_frames) * 100
-                no_face_percentage = (no_face_frames / total_analyzed_frames) * 100
-                
-                # Enhanced scoring logic for 24 FPS
-                base_cheating_score = looking_away_percentage * 0.7  # Base score from looking away
-                no_face_penalty = no_face_percentage * 0.3  # Additional penalty for no face detection
-                movement_penalty = min(25, len(suspicious_movements) * 2.5)  # Adjusted penalty for lower frame rate
-                
-                cheating_score = min(100, base_cheating_score + no_face_penalty + movement_penalty)
-                
-                # Determine if cheating is detected (adjusted threshold for 24 FPS)
-                is_cheating = cheating_score > 30  # Slightly higher threshold for 24 FPS
-                
-                # Generate analysis report
-                analysis_result = {
-                    'video_duration': duration,
-                    'video_fps': fps,
-                    'analysis_fps': fps / self.analysis_frame_skip,
-                    'total_frames': total_frames,
-                    'total_frames_analyzed': total_analyzed_frames,
-                    'looking_away_frames': looking_away_frames,
-                    'no_face_frames': no_face_frames,
-                    'looking_away_percentage': looking_away_percentage,
-                    'no_face_percentage': no_face_percentage,
-                    'cheating_score': cheating_score,
-                    'is_cheating_detected': is_cheating,
-                    'suspicious_movements': suspicious_movements[:20],  # Top 20 movements
-                    'total_suspicious_movements': len(suspicious_movements),
-                    'analysis_timestamp': datetime.now().isoformat(),
-                    'analysis_method': 'OpenCV Haar Cascades (24 FPS Optimized)',
-                    'optimization_notes': f'Frame skip: {self.analysis_frame_skip}, Effective analysis rate: {fps/self.analysis_frame_skip:.1f} FPS'
-                }
-                
-                # Save optimized detailed analysis
-                detailed_analysis_file = os.path.join(output_dir, 'detailed_eye_analysis.json')
-                with open(detailed_analysis_file, 'w') as f:
-                    json.dump({
-                        'summary': analysis_result,
-                        'frame_samples': detailed_analysis[-50:]  # Last 50 samples for debugging
-                    }, f, indent=2)
-                
-                # Save analysis results
-                analysis_file = os.path.join(output_dir, 'eye_analysis.json')
-                with open(analysis_file, 'w') as f:
-                    json.dump(analysis_result, f, indent=2)
-                
-                # Create human-readable report
-                report_file = os.path.join(output_dir, 'cheating_analysis.txt')
-                with open(report_file, 'w') as f:
-                    f.write("OPTIMIZED OPENCV EYE TRACKING ANALYSIS REPORT\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(f"Video Duration: {duration:.2f} seconds\n")
-                    f.write(f"Video FPS: {fps:.2f}\n")
-                    f.write(f"Analysis FPS: {fps/self.analysis_frame_skip:.2f} (optimized)\n")
-                    f.write(f"Total Frames: {total_frames}\n")
-                    f.write(f"Frames Analyzed: {total_analyzed_frames}\n")
-                    f.write(f"Analysis Method: OpenCV Haar Cascades (24 FPS Optimized)\n\n")
-                    
-                    f.write("BEHAVIORAL ANALYSIS:\n")
-                    f.write("-" * 25 + "\n")
-                    f.write(f"Looking Away Percentage: {looking_away_percentage:.2f}%\n")
-                    f.write(f"No Face Detection: {no_face_percentage:.2f}%\n")
-                    f.write(f"Suspicious Movements: {len(suspicious_movements)}\n")
-                    f.write(f"Cheating Score: {cheating_score:.2f}/100\n")
-                    f.write(f"Cheating Detected: {'YES' if is_cheating else 'NO'}\n\n")
-                    
-                    f.write("OPTIMIZATION DETAILS:\n")
-                    f.write("-" * 25 + "\n")
-                    f.write(f"Frame Skip Rate: {self.analysis_frame_skip}\n")
-                    f.write(f"Effective Analysis Rate: {fps/self.analysis_frame_skip:.1f} FPS\n")
-                    f.write(f"Performance Gain: ~{self.analysis_frame_skip}x faster processing\n\n")
-                    
-                    if suspicious_movements:
-                        f.write("TOP SUSPICIOUS MOMENTS:\n")
-                        f.write("-" * 25 + "\n")
-                        for i, movement in enumerate(suspicious_movements[:10]):
-                            f.write(f"{i+1}. Time: {movement['timestamp']:.2f}s - ")
-                            if movement['faces_detected'] == 0:
-                                f.write("Face not detected\n")
-                            else:
-                                f.write(f"Movement detected (Face: {movement['face_movement']:.1f}px, Eyes: {movement['eye_movement']:.1f}px)\n")
-                    
-                    f.write(f"\nANALYSIS COMPLETED: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-                print(f"Optimized analysis completed: Score {cheating_score:.2f}, Cheating: {is_cheating}")
-                return analysis_result
-            else:
-                raise Exception("No frames could be analyzed")
-                
-        except Exception as e:
-            print(f"Error in optimized eye tracking analysis: {e}")
-            return {
-                'error': str(e),
-                'is_cheating_detected': False,
-                'cheating_score': 0,
-                'video_duration': 0,
-                'total_frames_analyzed': 0,
-                'analysis_timestamp': datetime.now().isoformat()
-            }
-
 # Interview Result Generator Class
 class InterviewResultGenerator:
     """Generates comprehensive interview results by aggregating multiple data sources"""
@@ -456,7 +183,7 @@ class InterviewResultGenerator:
                 return json.load(f)
         return {}
         
-    def get_question_performance(self, session_info):
+    def get_question_performance(self, session_info, eye_analysis=None, audio_analysis=None):
         """Generate performance metrics for individual questions"""
         question_performance = []
         
@@ -466,12 +193,26 @@ class InterviewResultGenerator:
         # Get question timings
         timings = session_info.get('question_timings', [])
         
+        # Per-question integrity from the eye analysis windows, when available
+        integrity = {}
+        for entry in (eye_analysis or {}).get('question_breakdown', []):
+            integrity[entry['question_index']] = entry
+        
+        # Per-question transcripts and speech scores, when the audio was segmented by timings
+        answers = {}
+        for entry in (audio_analysis or {}).get('question_answers', []):
+            answers[entry['question_index']] = entry
+        
         for idx, timing in enumerate(timings):
             # Generate random scores for each question if real metrics aren't available
             relevance = random.uniform(0.5, 1.0) if idx % 2 == 0 else random.uniform(0.3, 0.9)
             confidence = random.uniform(0.4, 0.95)
             clarity = random.uniform(0.6, 0.98)
             
+            answer = answers.get(timing.get('questionIndex', idx))
+            if answer is not None:
+                relevance, clarity = answer['relevance'], answer['clarity']
+            
             question_data = {
                 'question_index': timing.get('questionIndex', idx),
                 'question': timing.get('question', f'Question {idx+1}'),
@@ -484,6 +225,22 @@ class InterviewResultGenerator:
                     'overall': round((relevance + confidence + clarity) / 3, 2)
                 }
             }
+            
+            if answer is not None:
+                question_data['transcript'] = answer['transcript']
+                question_data['speech_seconds'] = answer['speech_seconds']
+                question_data['rate_wpm'] = answer['rate_wpm']
+            
+            window = integrity.get(question_data['question_index'])
+            if window is not None:
+                question_data['duration'] = round(window['duration'])
+                question_data['integrity'] = {
+                    'integrity_score': window['integrity_score'],
+                    'looking_away_percentage': window.get('looking_away_percentage', 0),
+                    'no_face_percentage': window.get('no_face_percentage', 0),
+                    'suspicious_movements': window.get('total_suspicious_movements', 0),
+                    'flagged': window.get('is_cheating_detected', False)
+                }
             question_performance.append(question_data)
             
         return question_performance
@@ -654,7 +411,7 @@ class InterviewResultGenerator:
         audio_analysis = self.get_audio_analysis()
         
         # Generate question performance data
-        question_performance = self.get_question_performance(session_info)
+        question_performance = self.get_question_performance(session_info, eye_analysis, audio_analysis)
         
         # Get audio metrics if available
         audio_metrics = audio_analysis.get('metrics', {}) if audio_analysis else {}
@@ -695,13 +452,54 @@ class InterviewResultGenerator:
             
         return final_results
 
-def process_interview_async(session_id, username, video_path, audio_path=None):
+def create_eye_tracker(workers=1):
+    """Create an eye tracker with the configured analysis options"""
+    return OptimizedEyeTracker(
+        workers=workers,
+        frame_source=EYE_FRAME_SOURCE,
+        face_tracking=EYE_FACE_TRACKING,
+        search_window=EYE_SEARCH_WINDOW,
+        adaptive_sampling=EYE_ADAPTIVE_SAMPLING,
+        detector=EYE_DETECTOR,
+        use_proxy=EYE_ANALYSIS_PROXY,
+        use_index=EYE_SEEKABLE_INDEX,
+        pipeline_threads=EYE_PIPELINE_THREADS,
+        coarse_to_fine=EYE_COARSE_TO_FINE,
+        time_budget=EYE_TIME_BUDGET
+    )
+
+def prepare_analysis_inputs(video_path, frame_step):
+    """Seekable copy and analysis proxy of a recording that is analyzed from scratch"""
+    # Stream-copy remux first (seconds): the proxy and the tracker need its frame count
+    if EYE_SEEKABLE_INDEX:
+        prepare_recording_index(video_path)
+    if EYE_ANALYSIS_PROXY:
+        start_analysis_proxy(video_path, frame_step).join()
+
+def process_interview_async(session_id, username, video_path, audio_path=None, live_analysis=None, question_timings=None):
     """Process interview in background thread - optimized for separate streams"""
     try:
         print(f"Starting optimized background processing for session: {session_id}")
         user_dir = os.path.join(USERS_FOLDER, username)
         session_dir = os.path.join(user_dir, 'interview', session_id)
         
+        eye_tracker = create_eye_tracker(workers=EYE_ANALYSIS_WORKERS)
+        eye_tracker.worker_pool = eye_worker_pool
+        
+        # Cached results and the live analysis need neither the seekable copy nor the proxy
+        eye_cache_params = eye_tracker.cache_params()
+        eye_cache_params['question_starts'] = [t.get('timeFromStart', 0) for t in question_timings or []]
+        eye_cache_key = recording_cache_key('eye', video_path, EYE_ANALYSIS_VERSION, eye_cache_params)
+        analysis_result = analysis_cache.restore(eye_cache_key, session_dir, 'eye_analysis.json')
+        eye_from_cache = analysis_result is not None
+        
+        # A full analysis is certain: remux and transcode now, overlapping the audio extraction
+        preparation = None
+        if not eye_from_cache and live_analysis is None:
+            preparation = threading.Thread(target=prepare_analysis_inputs,
+                                           args=(video_path, eye_tracker.analysis_frame_skip), daemon=True)
+            preparation.start()
+        
         # Initialize processing status
         processing_status = {
             'video_analysis_completed': False,
@@ -727,16 +525,37 @@ def process_interview_async(session_id, username, video_path, audio_path=None):
                 print(f"Error extracting audio: {e}")
         
         # 2. Analyze video for eye movement (optimized for 24 FPS)
-        print("Starting optimized eye movement analysis...")
-        eye_tracker = OptimizedEyeTracker()
-        analysis_result = eye_tracker.analyze_video_for_cheating(video_path, session_dir)
+        if eye_from_cache:
+            print("Eye movement analysis restored from cache")
+            if live_analysis is not None:
+                live_analysis.abort()
+        elif live_analysis is not None:
+            # Most frames were already analyzed while recording - only drain the tail
+            print("Finishing live eye movement analysis...")
+            analysis_result = live_analysis.finish(LIVE_ANALYSIS_DRAIN_TIMEOUT, question_timings,
+                                                 LIVE_ANALYSIS_STALL_TIMEOUT)
+        
+        if analysis_result is None:
+            print("Starting optimized eye movement analysis...")
+            if preparation is not None:
+                preparation.join()
+            else:
+                # The live analysis failed: the recording is analyzed from scratch after all
+                prepare_analysis_inputs(video_path, eye_tracker.analysis_frame_skip)
+            analysis_result = eye_tracker.analyze_video_for_cheating(video_path, session_dir, question_timings)
         
         processing_status['video_analysis_completed'] = 'error' not in analysis_result
+        # A time budget that cut the analysis short or thinned it would otherwise be
+        # served for the configured settings from then on
+        budget_degraded = (analysis_result.get('time_budget') or {}).get('degraded', False)
+        if processing_status['video_analysis_completed'] and not eye_from_cache and not budget_degraded:
+            analysis_cache.store(eye_cache_key, session_dir, EYE_RESULT_FILES)
         
         # 3. Start audio processing if audio is ready
         if audio_ready:
             print("Starting audio processing pipeline...")
-            run_audio_processing(session_id, username, audio_path, BASE_DIR)
+            run_audio_processing(session_id, username, audio_path, BASE_DIR, analysis_cache, AUDIO_KEEP_INTERMEDIATE,
+                                 question_timings, AUDIO_SEGMENTATION, ASR_MODEL_SIZE)
             processing_status['audio_processing_started'] = True
         
         # 4. Create final analysis file in user directory
@@ -823,6 +642,25 @@ class InterviewSession:
 # Store active sessions
 active_sessions = {}
 
+# Incremental eye analyses of sessions that are still recording
+live_eye_analyses = {}
+live_eye_analyses_lock = threading.Lock()  # Guards the session cap when chunks arrive concurrently
+cv2.setNumThreads(LIVE_ANALYSIS_OPENCV_THREADS)
+
+def reap_idle_live_analyses():
+    """Stop the live analyses of sessions that stopped uploading and never saved a recording"""
+    while True:
+        time.sleep(60)
+        for session_id, live_analysis in list(live_eye_analyses.items()):
+            if live_analysis.idle_seconds() < LIVE_ANALYSIS_IDLE_TIMEOUT:
+                continue
+            # save_recording may have claimed it meanwhile
+            if live_eye_analyses.pop(session_id, None) is live_analysis:
+                print(f"Stopping idle live eye analysis for session: {session_id}")
+                live_analysis.abort()
+
+threading.Thread(target=reap_idle_live_analyses, daemon=True).start()
+
 @app.route('/')
 def index():
     if 'username' in session:
@@ -1173,9 +1011,11 @@ def save_recording():
             json.dump(interview_session.to_dict(), f, indent=2)
         
         # Start optimized background processing
+        live_analysis = live_eye_analyses.pop(session_id, None)
         threading.Thread(
             target=process_interview_async, 
-            args=(session_id, username, video_filepath, audio_filepath),
+            args=(session_id, username, video_filepath, audio_filepath, live_analysis,
+                  interview_session.question_timings),
             daemon=True
         ).start()
         
@@ -1191,6 +1031,52 @@ def save_recording():
         print(f"Save recording error: {e}")
         return jsonify({'error': 'Failed to save recording'}), 500
 
+@app.route('/api/upload-chunk', methods=['POST'])
+def upload_chunk():
+    """Receive one recording chunk and feed it to the session's live eye analysis"""
+    if 'username' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    try:
+        session_id = request.form.get('sessionId')
+        chunk_index = request.form.get('chunkIndex', type=int)
+        chunk_file = request.files.get('chunk')
+        
+        if not session_id or chunk_index is None or not chunk_file:
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        interview_session = active_sessions.get(session_id)
+        if not interview_session:
+            return jsonify({'error': 'Invalid session'}), 400
+        
+        if not LIVE_EYE_ANALYSIS:
+            return jsonify({'status': 'ignored'})
+        
+        live_analysis = live_eye_analyses.get(session_id)
+        if live_analysis is None:
+            if chunk_index != 0:
+                # Live analysis was not started for this session; the full upload is analyzed instead
+                return jsonify({'status': 'ignored'})
+            
+            session_dir = os.path.join(USERS_FOLDER, session['username'], 'interview', session_id)
+            with live_eye_analyses_lock:
+                if len(live_eye_analyses) >= LIVE_ANALYSIS_MAX_SESSIONS:
+                    print(f"Live eye analysis limit reached - session {session_id} is analyzed after upload")
+                    return jsonify({'status': 'ignored'})
+                live_analysis = IncrementalEyeAnalysis(session_id, session_dir, create_eye_tracker())
+                live_eye_analyses[session_id] = live_analysis
+        
+        live_analysis.add_chunk(chunk_index, chunk_file.read())
+        
+        return jsonify({
+            'status': 'success',
+            'frames_analyzed': live_analysis.stats['total_analyzed_frames']
+        })
+        
+    except Exception as e:
+        print(f"Upload chunk error: {e}")
+        return jsonify({'error': 'Failed to process chunk'}), 500
+
 @app.route('/api/finish-interview', methods=['POST'])
 def finish_interview():
     """Mark interview as completed and generate final report"""
@@ -1564,4 +1450,10 @@ if __name__ == '__main__':
     print(f"👤 Current logged in user: DakshVerma11")
     print("=" * 60)
     
+    # Load the detectors in the eye workers while the server starts
+    threading.Thread(target=eye_worker_pool.warm_up, args=(create_eye_tracker().get_settings(),),
+                     daemon=True).start()
+    # Load and warm the Whisper models so the first interview does not wait for them
+    threading.Thread(target=asr_models.warm_up, args=(ASR_MODEL_SIZES,), daemon=True).start()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,152 @@
+# Benchmark: throughput and agreement of the face/eye detector backends
+#
+# Decodes the sampled frames of a video once, then runs every backend over the same
+# gray analysis frames. Agreement is measured against a reference backend (Haar by
+# default): how often both agree on face presence, and the IoU of the main face box.
+#
+# Usage (from the Current directory):
+#   python benchmarks/bench_detectors.py path/to/interview.webm [--backends haar,lbp,yunet,res10]
+#       [--reference haar] [--max-frames 300] [--model-dir models]
+import os
+import sys
+import json
+import time
+import argparse
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_detectors import DETECTOR_BACKENDS, create_detector
+from frame_sources import OpenCVFrameSource, analysis_size
+
+
+def load_analysis_frames(video_path, skip=3, max_frames=300):
+    """Decode sampled frames once and convert them to gray analysis frames"""
+    frames = []
+    with OpenCVFrameSource(video_path, skip) as source:
+        for _, frame, _ in source:
+            height, width = frame.shape[:2]
+            new_width, new_height, scale_factor = analysis_size(width, height)
+            if scale_factor != 1.0:
+                frame = cv2.resize(frame, (new_width, new_height))
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            if len(frames) >= max_frames:
+                break
+    return frames
+
+
+def main_face(faces):
+    """Largest face box, or None"""
+    if len(faces) == 0:
+        return None
+    return tuple(max(faces, key=lambda f: f[2] * f[3]))
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = a[2] * a[3] + b[2] * b[3] - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def run_backend(detector, frames):
+    """Run face + eye detection over all frames; returns (main face per frame, eye counts, seconds)"""
+    faces_per_frame = []
+    eyes_per_frame = []
+    start = time.perf_counter()
+    for gray in frames:
+        face = main_face(detector.detect_faces(gray))
+        eyes = 0
+        if face is not None:
+            x, y, w, h = face
+            face_roi = gray[y:y + h, x:x + w]
+            if face_roi.size > 0:
+                eyes = len(detector.detect_eyes(face_roi))
+        faces_per_frame.append(face)
+        eyes_per_frame.append(eyes)
+    return faces_per_frame, eyes_per_frame, time.perf_counter() - start
+
+
+def compare(faces, reference_faces):
+    """Presence agreement and mean IoU against the reference detections"""
+    agree = sum(1 for a, b in zip(faces, reference_faces) if (a is None) == (b is None))
+    ious = [box_iou(a, b) for a, b in zip(faces, reference_faces) if a is not None and b is not None]
+    return {
+        'presence_agreement_percentage': round(agree / len(faces) * 100, 1) if faces else 0,
+        'mean_iou': round(sum(ious) / len(ious), 3) if ious else 0
+    }
+
+
+def run_benchmark(video_path, backends, reference='haar', max_frames=300, model_dir=None):
+    """Benchmark each backend on the same frames and return the results per backend"""
+    frames = load_analysis_frames(video_path, max_frames=max_frames)
+    if not frames:
+        raise Exception("No frames could be decoded")
+
+    names = list(dict.fromkeys([reference] + list(backends)))
+    detections = {}
+    results = {}
+
+    for name in names:
+        try:
+            load_start = time.perf_counter()
+            detector = create_detector(name, model_dir)
+            load_seconds = time.perf_counter() - load_start
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            continue
+
+        faces, eyes, seconds = run_backend(detector, frames)
+        detections[name] = faces
+        results[name] = {
+            'frames': len(frames),
+            'load_seconds': round(load_seconds, 3),
+            'seconds': round(seconds, 3),
+            'frames_per_second': round(len(frames) / seconds, 1) if seconds > 0 else 0,
+            'ms_per_frame': round(seconds / len(frames) * 1000, 2),
+            'face_detected_percentage': round(sum(1 for f in faces if f is not None) / len(frames) * 100, 1),
+            'two_eyes_percentage': round(sum(1 for e in eyes if e >= 2) / len(frames) * 100, 1)
+        }
+
+    if reference in detections:
+        for name, faces in detections.items():
+            results[name]['agreement_with_' + reference] = compare(faces, detections[reference])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark face/eye detector backends')
+    parser.add_argument('video', help='Sample video to benchmark on')
+    parser.add_argument('--backends', default=','.join(DETECTOR_BACKENDS),
+                        help=f"Comma separated backends (default: {','.join(DETECTOR_BACKENDS)})")
+    parser.add_argument('--reference', default='haar', help='Backend used as agreement reference (default: haar)')
+    parser.add_argument('--max-frames', type=int, default=300, help='Sampled frames to evaluate (default: 300)')
+    parser.add_argument('--model-dir', default=None, help='Directory with LBP/YuNet/res10 model files')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this file')
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    results = run_benchmark(args.video, backends, args.reference, args.max_frames, args.model_dir)
+
+    print(f"Detector benchmark: {args.video}")
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"  {name:6s}: skipped - {r['error']}")
+            continue
+        agreement = r.get('agreement_with_' + args.reference, {})
+        print(f"  {name:6s}: {r['frames_per_second']:7.1f} FPS ({r['ms_per_frame']:.2f} ms/frame), "
+              f"face {r['face_detected_percentage']:.1f}%, "
+              f"agreement {agreement.get('presence_agreement_percentage', 0):.1f}%, "
+              f"IoU {agreement.get('mean_iou', 0):.3f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
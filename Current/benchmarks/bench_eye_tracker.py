@@ -0,0 +1,333 @@
+# Benchmark: OptimizedEyeTracker hot path on deterministic synthetic interview videos
+#
+# Generates face-like test videos with OpenCV drawing (moving head, glances away,
+# absences) at several resolutions and frame rates, then measures:
+#   - per-stage time: decode, resize, cvtColor, face localization, eye cascade
+#   - analyze_frame throughput on pre-decoded frames
+#   - analyze_video_for_cheating end to end
+#   - peak RSS (each scenario runs in a fresh process)
+# Results are written as JSON; pass a previous result file to --compare to see
+# the change per scenario.
+#
+# Usage (from the Current directory):
+#   python benchmarks/bench_eye_tracker.py [--scenarios vga_24fps,hd_24fps] [--quick]
+#       [--frame-source opencv|ffmpeg] [--face-tracking] [--search-window] [--adaptive-sampling]
+#       [--detector haar] [--json results.json] [--compare baseline.json]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import multiprocessing
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eye_tracking import OptimizedEyeTracker
+from frame_sources import analysis_size
+
+try:
+    import resource
+except ImportError:  # Windows - peak RSS is not reported
+    resource = None
+
+VIDEO_DIR = os.path.join(tempfile.gettempdir(), 'eye_tracker_bench_videos')  # Generated once, reused by later runs
+SEED = 1234
+
+# Absences are fractions of the video duration during which nobody is in frame
+SCENARIOS = {
+    'vga_24fps': {'width': 640, 'height': 480, 'fps': 24, 'seconds': 30, 'absences': [(0.30, 0.36)]},
+    'hd_24fps': {'width': 1280, 'height': 720, 'fps': 24, 'seconds': 30, 'absences': [(0.30, 0.36)]},
+    'hd_30fps': {'width': 1280, 'height': 720, 'fps': 30, 'seconds': 30, 'absences': [(0.30, 0.36), (0.80, 0.84)]},
+    'fullhd_24fps': {'width': 1920, 'height': 1080, 'fps': 24, 'seconds': 20, 'absences': [(0.50, 0.58)]}
+}
+QUICK_SECONDS = 8
+
+
+def head_state(t, duration, width, height, absences):
+    """Head center, size and gaze offset at time t; None while the candidate is absent"""
+    if any(start * duration <= t < end * duration for start, end in absences):
+        return None
+
+    size = int(height * 0.42)
+    # Slow sway plus a quick glance to the side every 7 seconds
+    cx = width / 2 + width * 0.04 * np.sin(2 * np.pi * t / 9.0)
+    cy = height / 2 + height * 0.02 * np.sin(2 * np.pi * t / 5.0)
+    glance = (t % 7.0) < 0.6
+    if glance:
+        cx += width * 0.12
+    gaze = 0.6 if glance or (t % 11.0) < 0.8 else 0.0
+    return int(cx), int(cy), size, gaze
+
+
+def draw_frame(width, height, state, rng):
+    """Draw one frame: plain background with a face-like pattern and sensor noise"""
+    frame = np.full((height, width, 3), (90, 110, 120), np.uint8)
+    cv2.rectangle(frame, (0, int(height * 0.8)), (width, height), (60, 60, 70), -1)
+
+    if state is not None:
+        cx, cy, size, gaze = state
+        fw, fh = int(size * 0.8), size
+        cv2.ellipse(frame, (cx, cy + int(size * 0.9)), (int(size * 0.9), int(size * 0.5)), 0, 180, 360,
+                    (70, 50, 40), -1)
+        cv2.ellipse(frame, (cx, cy), (fw // 2, fh // 2), 0, 0, 360, (150, 175, 215), -1)
+        for side in (-1, 1):
+            ex, ey = cx + side * int(fw * 0.2), cy - int(fh * 0.08)
+            cv2.ellipse(frame, (ex, ey), (int(fw * 0.15), int(fh * 0.08)), 0, 0, 360, (110, 130, 170), -1)
+            cv2.line(frame, (ex - int(fw * 0.13), ey - int(fh * 0.1)), (ex + int(fw * 0.13), ey - int(fh * 0.1)),
+                     (40, 40, 50), max(3, size // 25))
+            cv2.ellipse(frame, (ex, ey), (int(fw * 0.1), int(fh * 0.04)), 0, 0, 360, (235, 235, 235), -1)
+            cv2.circle(frame, (ex + int(gaze * fw * 0.06), ey), int(fh * 0.035), (30, 20, 10), -1)
+        cv2.line(frame, (cx, cy - int(fh * 0.02)), (cx - int(fw * 0.05), cy + int(fh * 0.15)),
+                 (110, 130, 170), max(2, size // 50))
+        cv2.ellipse(frame, (cx, cy + int(fh * 0.27)), (int(fw * 0.18), int(fh * 0.05)), 0, 0, 180,
+                    (70, 70, 150), max(2, size // 40))
+
+    frame = cv2.GaussianBlur(frame, (5, 5), 0)
+    noise = rng.integers(-4, 5, size=frame.shape, dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_video(name, scenario, video_dir=VIDEO_DIR):
+    """Path of the scenario's video, generated on first use (MJPG AVI, deterministic)"""
+    width, height, fps, seconds = scenario['width'], scenario['height'], scenario['fps'], scenario['seconds']
+    path = os.path.join(video_dir, f"{name}_{width}x{height}_{fps}fps_{seconds}s_seed{SEED}.avi")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(video_dir, exist_ok=True)
+    print(f"Generating synthetic video {os.path.basename(path)}...")
+    partial_path = path + '.partial.avi'
+    writer = cv2.VideoWriter(partial_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    if not writer.isOpened():
+        raise Exception("Could not open an MJPG video writer")
+
+    rng = np.random.default_rng(SEED)
+    total_frames = int(fps * seconds)
+    for frame_number in range(total_frames):
+        t = frame_number / fps
+        writer.write(draw_frame(width, height, head_state(t, seconds, width, height, scenario['absences']), rng))
+    writer.release()
+    os.replace(partial_path, path)
+    return path
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children (e.g. ffmpeg)"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return round(own, 1), round(children, 1)
+
+
+def stage_breakdown(tracker, video_path, max_frames):
+    """Time each stage of the per-frame work separately on the sampled frames"""
+    stages = {'decode': 0.0, 'resize': 0.0, 'cvtColor': 0.0, 'face': 0.0, 'eye': 0.0}
+    frames = 0
+
+    with tracker.open_frame_source(video_path) as source:
+        iterator = iter(source)
+        while frames < max_frames:
+            start = time.perf_counter()
+            try:
+                _, frame, scale_factor = next(iterator)
+            except StopIteration:
+                break
+            stages['decode'] += time.perf_counter() - start
+            frames += 1
+
+            # The ffmpeg source delivers gray frames at analysis size (no resize/cvtColor)
+            if scale_factor is None:
+                height, width = frame.shape[:2]
+                new_width, new_height, scale = analysis_size(width, height)
+                if scale != 1.0:
+                    start = time.perf_counter()
+                    frame = cv2.resize(frame, (new_width, new_height))
+                    stages['resize'] += time.perf_counter() - start
+            if frame.ndim == 3:
+                start = time.perf_counter()
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                stages['cvtColor'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            faces = tracker.locate_faces(frame)
+            stages['face'] += time.perf_counter() - start
+
+            if len(faces) > 0:
+                x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+                face_roi = frame[y:y + h, x:x + w]
+                if face_roi.size > 0:
+                    start = time.perf_counter()
+                    tracker.detect_eye_in_face(face_roi)
+                    stages['eye'] += time.perf_counter() - start
+
+    total = sum(stages.values())
+    return {
+        'frames': frames,
+        'ms_per_frame': {name: round(seconds / frames * 1000, 3) if frames else 0 for name, seconds in stages.items()},
+        'share_percentage': {name: round(seconds / total * 100, 1) if total else 0 for name, seconds in stages.items()}
+    }
+
+
+def bench_analyze_frame(settings, video_path, max_frames):
+    """analyze_frame throughput on frames decoded up front (decode excluded)"""
+    tracker = OptimizedEyeTracker(**settings)
+    frames = []
+    with tracker.open_frame_source(video_path) as source:
+        for _, frame, scale_factor in source:
+            frames.append((frame, scale_factor))
+            if len(frames) >= max_frames:
+                break
+
+    start = time.perf_counter()
+    faces_found = 0
+    for frame, scale_factor in frames:
+        if tracker.analyze_frame(frame, scale_factor)['faces_detected'] > 0:
+            faces_found += 1
+    seconds = time.perf_counter() - start
+    return {
+        'frames': len(frames),
+        'seconds': round(seconds, 3),
+        'frames_per_second': round(len(frames) / seconds, 1) if seconds > 0 else 0,
+        'face_detected_percentage': round(faces_found / len(frames) * 100, 1) if frames else 0
+    }
+
+
+def bench_full_analysis(settings, video_path):
+    """analyze_video_for_cheating end to end (decode + analysis + report files)"""
+    tracker = OptimizedEyeTracker(**settings)
+    output_dir = tempfile.mkdtemp(prefix='bench_eye_')
+    try:
+        start = time.perf_counter()
+        result = tracker.analyze_video_for_cheating(video_path, output_dir)
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    if 'error' in result:
+        return {'error': result['error']}
+    return {
+        'seconds': round(seconds, 3),
+        'video_seconds': round(result['video_duration'], 2),
+        'video_frames_per_second': round(result['total_frames'] / seconds, 1) if seconds > 0 else 0,
+        'analyzed_frames_per_second': round(result['total_frames_analyzed'] / seconds, 1) if seconds > 0 else 0,
+        'realtime_factor': round(result['video_duration'] / seconds, 2) if seconds > 0 else 0,
+        'cheating_score': round(result['cheating_score'], 2),
+        'no_face_percentage': round(result['no_face_percentage'], 1)
+    }
+
+
+def run_scenario(name, scenario, settings, max_frames, video_dir=VIDEO_DIR):
+    """Run every measurement for one scenario (called in a fresh process)"""
+    cv2.setNumThreads(1)  # Stable single-thread numbers, like the analysis workers
+    video_path = synthetic_video(name, scenario, video_dir)
+    result = {
+        'video': {k: scenario[k] for k in ('width', 'height', 'fps', 'seconds')},
+        'stages': stage_breakdown(OptimizedEyeTracker(**settings), video_path, max_frames),
+        'analyze_frame': bench_analyze_frame(settings, video_path, max_frames),
+        'analyze_video_for_cheating': bench_full_analysis(settings, video_path)
+    }
+    result['peak_rss_mb'], result['peak_child_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def compare_results(results, settings, baseline):
+    """Print throughput changes against a previous result file"""
+    print(f"Compared with {baseline.get('timestamp', 'baseline')}:")
+    if baseline.get('settings') != settings:
+        print(f"  (baseline used different settings: {baseline.get('settings')})")
+    for name, result in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous or 'error' in result or 'error' in previous:
+            continue
+        for section, key in (('analyze_frame', 'frames_per_second'),
+                             ('analyze_video_for_cheating', 'video_frames_per_second')):
+            old, new = previous[section].get(key), result[section].get(key)
+            if old and new:
+                print(f"  {name:13s} {section:27s} {old:8.1f} -> {new:8.1f} FPS ({(new / old - 1) * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the eye tracker on synthetic interview videos')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--quick', action='store_true', help=f'Use {QUICK_SECONDS} second videos')
+    parser.add_argument('--max-frames', type=int, default=200, help='Sampled frames for the per-frame benchmarks')
+    parser.add_argument('--frame-source', default='opencv', choices=['opencv', 'ffmpeg'])
+    parser.add_argument('--face-tracking', action='store_true')
+    parser.add_argument('--search-window', action='store_true')
+    parser.add_argument('--adaptive-sampling', action='store_true')
+    parser.add_argument('--detector', default='haar')
+    parser.add_argument('--video-dir', default=VIDEO_DIR, help='Where generated videos are kept')
+    parser.add_argument('--json', dest='json_path', default=None, help='Write the results to this file')
+    parser.add_argument('--compare', default=None, help='Previous result file to compare against')
+    args = parser.parse_args()
+
+    settings = {
+        'frame_source': args.frame_source,
+        'face_tracking': args.face_tracking,
+        'search_window': args.search_window,
+        'adaptive_sampling': args.adaptive_sampling,
+        'detector': args.detector
+    }
+
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario: {name} (available: {', '.join(SCENARIOS)})")
+        scenario = dict(SCENARIOS[name])
+        if args.quick:
+            scenario['seconds'] = QUICK_SECONDS
+
+        # A fresh process per scenario so peak RSS is not inherited from earlier ones
+        with context.Pool(1) as pool:
+            try:
+                results[name] = pool.apply(run_scenario, (name, scenario, settings, args.max_frames, args.video_dir))
+            except Exception as e:
+                results[name] = {'error': str(e)}
+
+        r = results[name]
+        if 'error' in r:
+            print(f"{name}: failed - {r['error']}")
+            continue
+        stages = r['stages']['ms_per_frame']
+        full = r['analyze_video_for_cheating']
+        print(f"{name}: analyze_frame {r['analyze_frame']['frames_per_second']:.1f} FPS, "
+              f"full analysis {full.get('video_frames_per_second', 0):.1f} video FPS "
+              f"({full.get('realtime_factor', 0):.1f}x realtime), peak RSS {r['peak_rss_mb']} MB")
+        print("    ms/frame: " + ', '.join(f"{stage} {ms:.2f}" for stage, ms in stages.items()))
+
+    output = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': settings,
+        'quick': args.quick,
+        'scenarios': results
+    }
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(results, settings, json.load(f))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
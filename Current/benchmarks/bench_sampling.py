@@ -0,0 +1,98 @@
+# Benchmark: frame sampling throughput of the eye tracker ('read' vs 'grab' vs 'ffmpeg')
+#
+# Usage (from the Current directory):
+#   python benchmarks/bench_sampling.py path/to/interview.webm [--max-frames 2000] [--skip 3] [--decode-only] [--ffmpeg]
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eye_tracking import OptimizedEyeTracker
+from frame_sources import OpenCVFrameSource, FFmpegGrayFrameSource
+
+
+def open_source(video_path, sampling_mode, skip, max_frames):
+    """Frame source for a benchmark mode ('read', 'grab' or 'ffmpeg')"""
+    if sampling_mode == 'ffmpeg':
+        return FFmpegGrayFrameSource(video_path, skip, 0, max_frames)
+    return OpenCVFrameSource(video_path, skip, 0, max_frames, sampling_mode)
+
+
+def decode_only(video_path, sampling_mode, skip, max_frames):
+    """Run the frame source without analysis and return (frames consumed, frames sampled)"""
+    sampled_frames = 0
+    with open_source(video_path, sampling_mode, skip, max_frames) as source:
+        for _ in source:
+            sampled_frames += 1
+        frames = source.last_frame
+    return frames, sampled_frames
+
+
+def full_analysis(video_path, sampling_mode, skip, max_frames):
+    """Run the tracker's own range analysis and return (frames consumed, frames sampled)"""
+    if sampling_mode == 'ffmpeg':
+        tracker = OptimizedEyeTracker(analysis_frame_skip=skip, frame_source='ffmpeg')
+    else:
+        tracker = OptimizedEyeTracker(analysis_frame_skip=skip, sampling_mode=sampling_mode)
+    stats = tracker.analyze_range(video_path, 0, max_frames)
+    return stats['last_frame'], stats['total_analyzed_frames']
+
+
+def run_benchmark(video_path, skip=3, max_frames=2000, decode_only_mode=False, repeats=3, modes=('read', 'grab')):
+    """Time each sampling mode on the same file and return the results"""
+    runner = decode_only if decode_only_mode else full_analysis
+    results = {}
+
+    for mode in modes:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            frames, sampled = runner(video_path, mode, skip, max_frames)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        results[mode] = {
+            'frames': frames,
+            'sampled_frames': sampled,
+            'seconds': round(best, 4),
+            'video_fps_throughput': round(frames / best, 1) if best > 0 else 0,
+            'analyzed_fps_throughput': round(sampled / best, 1) if best > 0 else 0
+        }
+
+    # Speedup of every mode relative to the old read-everything path
+    if 'read' in results:
+        results['speedup'] = {
+            mode: round(results['read']['seconds'] / results[mode]['seconds'], 2)
+            for mode in modes if mode != 'read' and results[mode]['seconds'] > 0
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare frame sampling throughput of the eye tracker')
+    parser.add_argument('video', help='Video file to benchmark')
+    parser.add_argument('--skip', type=int, default=3, help='Analyze every Nth frame (default: 3)')
+    parser.add_argument('--max-frames', type=int, default=2000, help='Frames to consume per run (default: 2000)')
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per mode, best time is reported (default: 3)')
+    parser.add_argument('--decode-only', action='store_true', help='Skip face/eye analysis and time decoding only')
+    parser.add_argument('--ffmpeg', action='store_true', help='Also time the ffmpeg gray raw-pipe frame source')
+    args = parser.parse_args()
+
+    modes = ('read', 'grab', 'ffmpeg') if args.ffmpeg else ('read', 'grab')
+    results = run_benchmark(args.video, args.skip, args.max_frames, args.decode_only, args.repeats, modes)
+
+    print(f"Sampling benchmark: {args.video} (skip={args.skip}, {'decode only' if args.decode_only else 'full analysis'})")
+    for mode in modes:
+        r = results[mode]
+        print(f"  {mode:5s}: {r['frames']} frames in {r['seconds']:.2f}s - "
+              f"{r['video_fps_throughput']:.1f} video FPS, {r['analyzed_fps_throughput']:.1f} analyzed FPS")
+    for mode, speedup in results.get('speedup', {}).items():
+        print(f"  {mode} speedup vs read: {speedup:.2f}x")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+# Cheating score for the eye tracker, shared by the live/recorded analysis and
+# the re-scoring of stored timelines (eye_timeline.npy)
+#
+# Re-scoring recomputes looking-away, suspicious movements and the score from the
+# per-frame columns with vectorized NumPy, so thresholds can be tuned without
+# decoding any video again.
+#
+# During an analysis, MovementAggregator keeps the suspicious movement statistics
+# in constant memory: counters, the most severe events and fixed-bin histograms.
+import os
+import json
+import heapq
+from datetime import datetime
+
+import numpy as np
+
+from eye_timeline import TIMELINE_FILENAME, load_timeline, slice_by_time
+
+# Thresholds and weights used by OptimizedEyeTracker (tuned for 24 FPS recordings)
+DEFAULT_SCORING = {
+    'face_movement_threshold': 25,    # px between analyzed frames
+    'eye_movement_threshold': 18,     # px, average over both eyes
+    'looking_away_weight': 0.7,
+    'no_face_weight': 0.3,
+    'movement_penalty': 2.5,          # per suspicious movement
+    'max_movement_penalty': 25,
+    'cheating_threshold': 30
+}
+
+# Bin edges (px) of the face/eye movement histograms; the last bin is open-ended
+MOVEMENT_HISTOGRAM_EDGES = (0, 2, 5, 10, 15, 20, 25, 30, 40, 50, 75, 100)
+# A frame without a face ranks with the movements of the open-ended top histogram bin
+# (severities are multiples of the threshold), so ordinary movements do not push
+# absences out of the most severe events
+NO_FACE_MOVEMENT_PX = MOVEMENT_HISTOGRAM_EDGES[-1]
+
+
+def scoring_params(overrides=None):
+    """Default scoring parameters with the given overrides applied"""
+    params = dict(DEFAULT_SCORING)
+    if overrides:
+        unknown = set(overrides) - set(DEFAULT_SCORING)
+        if unknown:
+            raise Exception(f"Unknown scoring parameters: {', '.join(sorted(unknown))}")
+        params.update(overrides)
+    return params
+
+
+def compute_cheating_score(looking_away_percentage, no_face_percentage, suspicious_count, params=None):
+    """Return (cheating_score, is_cheating_detected)"""
+    params = params or DEFAULT_SCORING
+    base_cheating_score = looking_away_percentage * params['looking_away_weight']
+    no_face_penalty = no_face_percentage * params['no_face_weight']
+    movement_penalty = min(params['max_movement_penalty'], suspicious_count * params['movement_penalty'])
+
+    cheating_score = min(100, base_cheating_score + no_face_penalty + movement_penalty)
+    return cheating_score, cheating_score > params['cheating_threshold']
+
+
+def movement_severity(face_movement, eye_movement, faces_detected, params=None):
+    """How far a suspicious movement exceeds its thresholds (works on scalars and arrays)"""
+    params = params or DEFAULT_SCORING
+    severity = np.maximum(np.divide(face_movement, params['face_movement_threshold']),
+                          np.divide(eye_movement, params['eye_movement_threshold']))
+    no_face_severity = max(NO_FACE_MOVEMENT_PX / params['face_movement_threshold'],
+                           NO_FACE_MOVEMENT_PX / params['eye_movement_threshold'])
+    return np.where(np.equal(faces_detected, 0), np.maximum(severity, no_face_severity), severity)
+
+
+def movement_histogram(values):
+    """Counts per MOVEMENT_HISTOGRAM_EDGES bin, including the open-ended last bin"""
+    bins = np.searchsorted(MOVEMENT_HISTOGRAM_EDGES, values, side='right') - 1
+    return np.bincount(np.clip(bins, 0, None), minlength=len(MOVEMENT_HISTOGRAM_EDGES)).tolist()
+
+
+def histogram_report(counts):
+    """JSON form of a movement histogram"""
+    edges = list(MOVEMENT_HISTOGRAM_EDGES)
+    return {
+        'bin_edges_px': edges,
+        'counts': [int(count) for count in counts]
+    }
+
+
+class MovementAggregator:
+    """Streaming statistics of analyzed frames in constant memory
+    
+    Keeps the suspicious movement count, a bounded min-heap of the most severe
+    suspicious movements and histograms of the face/eye movement of every frame,
+    so memory does not grow with the video length.
+    """
+    
+    def __init__(self, max_events=20, params=None):
+        self.max_events = max_events
+        self.params = params or DEFAULT_SCORING
+        self.suspicious_count = 0
+        self.heap = []  # (severity, -timestamp, movement): the root is the least severe kept event
+        self.face_histogram = [0] * len(MOVEMENT_HISTOGRAM_EDGES)
+        self.eye_histogram = [0] * len(MOVEMENT_HISTOGRAM_EDGES)
+    
+    def histogram_bin(self, value):
+        return max(0, int(np.searchsorted(MOVEMENT_HISTOGRAM_EDGES, value, side='right')) - 1)
+    
+    def add_frame(self, face_movement, eye_movement):
+        self.face_histogram[self.histogram_bin(face_movement)] += 1
+        self.eye_histogram[self.histogram_bin(eye_movement)] += 1
+    
+    def update_frame(self, old_movement, new_movement):
+        """Move a frame between histogram bins after its (face, eye) movement was recomputed"""
+        for histogram, old, new in ((self.face_histogram, old_movement[0], new_movement[0]),
+                                    (self.eye_histogram, old_movement[1], new_movement[1])):
+            histogram[self.histogram_bin(old)] -= 1
+            histogram[self.histogram_bin(new)] += 1
+    
+    def add_event(self, movement, severity=None):
+        """Count a suspicious movement and keep it if it is among the most severe"""
+        self.suspicious_count += 1
+        if severity is None:
+            severity = float(movement_severity(movement['face_movement'], movement['eye_movement'],
+                                               movement['faces_detected'], self.params))
+        self.push(severity, movement)
+    
+    def push(self, severity, movement):
+        # Ties keep the earlier event
+        entry = (severity, -movement['timestamp'], movement)
+        if len(self.heap) < self.max_events:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+    
+    def merge(self, other):
+        """Add the statistics of another aggregator (e.g. a later range of the same video)"""
+        self.suspicious_count += other.suspicious_count
+        for severity, _, movement in other.heap:
+            self.push(severity, movement)
+        self.face_histogram = [a + b for a, b in zip(self.face_histogram, other.face_histogram)]
+        self.eye_histogram = [a + b for a, b in zip(self.eye_histogram, other.eye_histogram)]
+    
+    def top_events(self):
+        """Kept movements, most severe first, each with its severity"""
+        events = []
+        for severity, _, movement in sorted(self.heap, key=lambda entry: entry[:2], reverse=True):
+            event = dict(movement)
+            event['severity'] = round(severity, 3)
+            events.append(event)
+        return events
+    
+    def histograms(self):
+        return {
+            'face_movement': histogram_report(self.face_histogram),
+            'eye_movement': histogram_report(self.eye_histogram)
+        }
+
+
+def rescore_timeline(timeline, params=None, max_movements=20):
+    """Recompute the eye analysis scores from a timeline array
+
+    Mirrors OptimizedEyeTracker.analyze_frame: a frame is looking away when no face
+    is found, fewer than two eyes are found, or the face/eye movement exceeds its
+    threshold. Returns the same score fields as eye_analysis.json; the reported
+    movements are the most severe ones, ranked like MovementAggregator.
+    """
+    params = params or DEFAULT_SCORING
+    total = len(timeline)
+    if total == 0:
+        raise Exception("Timeline is empty")
+
+    faces = timeline['faces']
+    face_movement = timeline['face_movement']
+    eye_movement = timeline['eye_movement']
+
+    no_face = faces == 0
+    moved = ((face_movement > params['face_movement_threshold']) |
+             (eye_movement > params['eye_movement_threshold']))
+    looking_away = no_face | (timeline['eyes'] < 2) | moved
+    suspicious = np.flatnonzero(looking_away & (moved | no_face))
+
+    looking_away_frames = int(np.count_nonzero(looking_away))
+    no_face_frames = int(np.count_nonzero(no_face))
+    looking_away_percentage = looking_away_frames / total * 100
+    no_face_percentage = no_face_frames / total * 100
+    cheating_score, is_cheating = compute_cheating_score(
+        looking_away_percentage, no_face_percentage, len(suspicious), params)
+
+    # Most severe first; the stable sort keeps earlier frames first on ties
+    severity = movement_severity(face_movement[suspicious], eye_movement[suspicious], faces[suspicious], params)
+    ranked = np.argsort(-severity, kind='stable')[:max_movements]
+    
+    # Only the reported movements are converted to dicts
+    suspicious_movements = [
+        {
+            'timestamp': float(row['timestamp']),
+            'face_movement': float(row['face_movement']),
+            'eye_movement': float(row['eye_movement']),
+            'faces_detected': int(row['faces']),
+            'eyes_detected': int(row['eyes']),
+            'type': 'suspicious_behavior',
+            'severity': round(float(severity[rank]), 3)
+        }
+        for rank, row in zip(ranked, timeline[suspicious[ranked]])
+    ]
+
+    return {
+        'total_frames_analyzed': total,
+        'looking_away_frames': looking_away_frames,
+        'no_face_frames': no_face_frames,
+        'looking_away_percentage': looking_away_percentage,
+        'no_face_percentage': no_face_percentage,
+        'cheating_score': float(cheating_score),
+        'is_cheating_detected': bool(is_cheating),
+        'suspicious_movements': suspicious_movements,
+        'total_suspicious_movements': int(len(suspicious)),
+        'movement_histograms': {
+            'face_movement': histogram_report(movement_histogram(face_movement)),
+            'eye_movement': histogram_report(movement_histogram(eye_movement))
+        }
+    }
+
+
+def question_windows(question_timings, duration):
+    """Time window of every question: from its timeFromStart until the next question starts"""
+    timings = sorted(enumerate(question_timings), key=lambda item: float(item[1].get('timeFromStart', 0)))
+    windows = []
+    for position, (idx, timing) in enumerate(timings):
+        start_time = float(timing.get('timeFromStart', 0))
+        if position + 1 < len(timings):
+            end_time = float(timings[position + 1][1].get('timeFromStart', 0))
+        else:
+            end_time = duration
+        windows.append({
+            'question_index': timing.get('questionIndex', idx),
+            'question': timing.get('question', f'Question {idx + 1}'),
+            'start_time': start_time,
+            'end_time': max(start_time, end_time)
+        })
+    return windows
+
+
+def question_breakdown(timeline, windows, params=None):
+    """Per-question integrity scores from the timeline rows inside each question window"""
+    breakdown = []
+    for position, window in enumerate(windows):
+        # The last question runs to the end of the recording
+        end_time = window['end_time'] if position + 1 < len(windows) else None
+        rows = slice_by_time(timeline, window['start_time'], end_time)
+
+        entry = dict(window)
+        entry['duration'] = window['end_time'] - window['start_time']
+        entry['total_frames_analyzed'] = len(rows)
+        if len(rows) == 0:
+            entry['integrity_score'] = None
+            breakdown.append(entry)
+            continue
+
+        scores = rescore_timeline(rows, params, max_movements=0)
+        entry.update({
+            'looking_away_percentage': round(scores['looking_away_percentage'], 2),
+            'no_face_percentage': round(scores['no_face_percentage'], 2),
+            'total_suspicious_movements': scores['total_suspicious_movements'],
+            'cheating_score': round(scores['cheating_score'], 2),
+            'is_cheating_detected': scores['is_cheating_detected'],
+            'integrity_score': round(100 - scores['cheating_score'], 2)
+        })
+        breakdown.append(entry)
+    return breakdown
+
+
+def rescore_session(session_dir, params=None, write=False):
+    """Re-score one interview session from its stored timeline
+
+    With write=True the score fields of eye_analysis.json are replaced and the
+    parameters used are recorded under 'rescoring'.
+    """
+    params = scoring_params(params)
+    timeline_file = os.path.join(session_dir, TIMELINE_FILENAME)
+    if not os.path.exists(timeline_file):
+        return {'session_dir': session_dir, 'error': 'No stored timeline'}
+
+    try:
+        result = rescore_timeline(load_timeline(timeline_file), params)
+        result['session_dir'] = session_dir
+
+        analysis_file = os.path.join(session_dir, 'eye_analysis.json')
+        if write and os.path.exists(analysis_file):
+            with open(analysis_file, 'r') as f:
+                analysis = json.load(f)
+            previous_score = analysis.get('cheating_score')
+            analysis.update({k: v for k, v in result.items() if k != 'session_dir'})
+            if analysis.get('question_breakdown'):
+                windows = [{key: entry[key] for key in ('question_index', 'question', 'start_time', 'end_time')}
+                           for entry in analysis['question_breakdown']]
+                analysis['question_breakdown'] = question_breakdown(load_timeline(timeline_file), windows, params)
+            analysis['rescoring'] = {
+                'params': params,
+                'previous_cheating_score': previous_score,
+                'rescored_at': datetime.now().isoformat()
+            }
+            with open(analysis_file, 'w') as f:
+                json.dump(analysis, f, indent=2)
+            result['written'] = True
+
+        return result
+    except Exception as e:
+        return {'session_dir': session_dir, 'error': str(e)}
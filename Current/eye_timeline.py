@@ -0,0 +1,101 @@
+# Columnar per-frame eye-tracking timeline
+# Every analyzed frame becomes one fixed-size row in a structured NumPy array that is
+# saved as a plain .npy file, so readers can memory-map it and slice rows or columns
+# without parsing JSON.
+import os
+
+import numpy as np
+
+TIMELINE_FILENAME = 'eye_timeline.npy'
+
+TIMELINE_DTYPE = np.dtype([
+    ('frame_number', '<u4'),
+    ('timestamp', '<f4'),
+    ('faces', 'u1'),
+    ('eyes', 'u1'),
+    ('face_movement', '<f4'),
+    ('eye_movement', '<f4'),
+    ('looking_away', '?'),
+    ('inferred', '?')  # Static frame carried forward by adaptive sampling
+])
+
+
+def timeline_row(frame_analysis):
+    """Convert a frame analysis dict into a timeline row tuple"""
+    return (
+        frame_analysis['frame_number'],
+        frame_analysis['timestamp'],
+        min(255, frame_analysis['faces_detected']),
+        min(255, frame_analysis['eyes_detected']),
+        frame_analysis['face_movement'],
+        frame_analysis['eye_movement'],
+        frame_analysis['looking_away'],
+        frame_analysis.get('inferred', False)
+    )
+
+
+class TimelineRecorder:
+    """Append-only timeline buffer, grown in fixed-size blocks"""
+
+    def __init__(self, block_size=4096):
+        self.block_size = block_size
+        self.chunks = []  # Completed row arrays, in order
+        self.current = np.empty(block_size, dtype=TIMELINE_DTYPE)
+        self.count = 0    # Rows used in the current block
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks) + self.count
+
+    def flush(self):
+        """Move the rows of the current block into the completed chunks"""
+        if self.count:
+            self.chunks.append(self.current[:self.count])
+            self.current = np.empty(self.block_size, dtype=TIMELINE_DTYPE)
+            self.count = 0
+
+    def append(self, frame_analysis):
+        if self.count == self.block_size:
+            self.flush()
+        self.current[self.count] = timeline_row(frame_analysis)
+        self.count += 1
+
+    def set_row(self, index, frame_analysis):
+        """Overwrite a recorded row (used when a range's first frame is re-evaluated)"""
+        for chunk in self.chunks:
+            if index < len(chunk):
+                chunk[index] = timeline_row(frame_analysis)
+                return
+            index -= len(chunk)
+        self.current[index] = timeline_row(frame_analysis)
+
+    def extend(self, other):
+        """Append all rows of another recorder"""
+        self.flush()
+        if len(other):
+            self.chunks.append(other.to_array())
+
+    def to_array(self):
+        return np.concatenate(self.chunks + [self.current[:self.count]])
+
+    def save(self, path):
+        np.save(path, self.to_array())
+
+
+def timeline_path(session_dir):
+    return os.path.join(session_dir, TIMELINE_FILENAME)
+
+
+def load_timeline(path, start=None, stop=None, mmap=True):
+    """Load a timeline (or a row slice of it); memory-mapped by default so only touched rows are read"""
+    timeline = np.load(path, mmap_mode='r' if mmap else None)
+    if start is not None or stop is not None:
+        timeline = timeline[start:stop]
+    return timeline
+
+
+def slice_by_time(timeline, start_seconds=None, end_seconds=None):
+    """Rows whose timestamp falls in [start_seconds, end_seconds)"""
+    timestamps = timeline['timestamp']
+    start = 0 if start_seconds is None else int(np.searchsorted(timestamps, start_seconds, side='left'))
+    stop = len(timeline) if end_seconds is None else int(np.searchsorted(timestamps, end_seconds, side='left'))
+    return timeline[start:stop]
@@ -0,0 +1,1519 @@
+# Eye tracking module for interview cheating detection
+# Kept free of Flask/audio imports so worker processes can load it cheaply
+import os
+import json
+import time
+import queue
+import threading
+import multiprocessing
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from frame_sources import (OpenCVFrameSource, FFmpegGrayFrameSource, ProxyFrameSource, IndexedFrameSource,
+                           probe_video)
+from analysis_proxy import load_proxy_info
+from recording_index import load_recording_index
+from face_detectors import create_detector, DETECTOR_BACKENDS
+from eye_timeline import TimelineRecorder, TIMELINE_FILENAME
+from eye_scoring import (DEFAULT_SCORING, MovementAggregator, compute_cheating_score,
+                         question_windows, question_breakdown)
+
+# Bump when a change alters the analysis output, so cached results are not reused
+EYE_ANALYSIS_VERSION = 3
+EYE_RESULT_FILES = ['eye_analysis.json', 'detailed_eye_analysis.json', 'cheating_analysis.txt', TIMELINE_FILENAME]
+
+# Settings tried under a time budget, most accurate first:
+# (multiple of the frame skip, analysis width, use a cheaper detector backend)
+# Resolution goes last: below 640 the Haar eye cascade (20px window) starts missing eyes
+TIME_BUDGET_LADDER = (
+    (1, 640, False),
+    (2, 640, False),
+    (2, 640, True),
+    (4, 640, True),
+    (8, 640, True),
+    (8, 480, True),
+    (16, 320, True)
+)
+
+
+def _analyze_segment(video_path, start_frame, end_frame, settings, time_limit=None):
+    """Worker entry point: analyze one frame range with its own tracker
+    
+    time_limit (seconds) counts from when the range starts, not from when it was queued.
+    """
+    # One OpenCV thread per worker - the pool itself provides the parallelism
+    cv2.setNumThreads(1)
+    tracker = OptimizedEyeTracker(**settings)
+    tracker.deadline = time.time() + time_limit if time_limit is not None else None
+    return tracker.analyze_range(video_path, start_frame, end_frame)
+
+
+def detection_thread_count(pipeline_threads, face_tracking, search_window):
+    """Detection threads a pipelined analysis actually runs with these settings
+
+    Face tracking and the search window depend on the previous frame's face, so
+    either one limits the pipeline to a single detection thread.
+    """
+    if pipeline_threads <= 0:
+        return 0
+    return 1 if face_tracking or search_window else pipeline_threads
+
+
+def range_core_count(pipeline_threads, face_tracking, search_window, frame_source):
+    """Cores one range analysis keeps busy: its detection threads, the decode thread
+    feeding a pipeline, and the ffmpeg decoder subprocess of the ffmpeg frame source
+    """
+    detection_threads = detection_thread_count(pipeline_threads, face_tracking, search_window)
+    # A serial analysis decodes and detects on one thread
+    cores = detection_threads + 1 if detection_threads > 0 else 1
+    return cores + 1 if frame_source == 'ffmpeg' else cores
+
+
+class OptimizedEyeTracker:
+    def __init__(self, analysis_frame_skip=3, workers=1, sampling_mode='grab', frame_source='opencv',
+                 face_tracking=False, search_window=False, adaptive_sampling=False,
+                 detector='haar', model_dir=None, use_proxy=False, pipeline_threads=0,
+                 coarse_to_fine=False, use_index=False, max_width=640, time_budget=None,
+                 movement_frame_gap=None):
+        # Face/eye detector backend (Haar cascades by default), loaded on first use so a
+        # tracker that hands all frames to the worker pool never loads the models
+        if detector not in DETECTOR_BACKENDS:
+            raise Exception(f"Unknown detector backend: {detector} (available: {', '.join(DETECTOR_BACKENDS)})")
+        self.detector_name = detector
+        self.model_dir = model_dir
+        self._detector = None
+        self.spare_detectors = {}  # Other backends loaded for time budget calibration, by name
+        
+        # Optimized tracking parameters for 24 FPS
+        self.prev_face_center = None
+        self.prev_eye_centers = None
+        self.face_movement_threshold = DEFAULT_SCORING['face_movement_threshold']  # Slightly higher for 24 FPS
+        self.eye_movement_threshold = DEFAULT_SCORING['eye_movement_threshold']    # Adjusted for lower frame rate
+        
+        # Frame analysis optimization
+        self.analysis_frame_skip = analysis_frame_skip  # Analyze every 3rd frame (8 FPS effective analysis)
+        # Frame gap the movement thresholds are meant for; movement measured over a wider
+        # sampling gap (time budget) is scaled down to it
+        self.movement_frame_gap = movement_frame_gap or analysis_frame_skip
+        self.max_width = max_width  # Frames are analyzed at most this wide (faces below 60px at 640 are ignored)
+        # 'read' decodes and converts every frame, 'grab' only advances past skipped frames
+        self.sampling_mode = sampling_mode
+        # 'opencv' decodes with cv2.VideoCapture, 'ffmpeg' receives scaled gray frames on a pipe
+        self.frame_source = frame_source
+        # Decode the upload-time analysis proxy (analysis_proxy.py) instead of the original when present
+        self.use_proxy = use_proxy
+        # Decode the seekable copy and trust the frame index (recording_index.py) when present
+        self.use_index = use_index
+        
+        # Parallel segment analysis (1 = serial)
+        self.workers = max(1, workers)
+        self.min_segment_seconds = 20  # Shorter ranges are not worth a worker process
+        
+        # Detect-then-track: follow the last detected face with template matching
+        self.face_tracking = face_tracking
+        self.redetect_interval = 8         # Full face cascade at least every 8 sampled frames
+        self.tracking_min_confidence = 0.6  # Normalized match score below which we re-detect
+        self.track_box = None               # Face box in analysis (scaled) coordinates
+        self.track_template = None
+        self.frames_since_detection = 0
+        
+        # Predicted search window: look near the previous face, at a similar scale, first
+        self.search_window = search_window
+        self.search_margin = 0.5         # Window extends half a face beyond the previous box
+        self.search_scale_range = 1.35   # Accepted face size: previous size / 1.35 to * 1.35
+        self.last_face_box = None        # Largest face of the previous sampled frame (scaled coordinates)
+        
+        # Coarse-to-fine: a sparse pass flags windows with no face or large movement and
+        # only those windows are analyzed densely (long recordings only)
+        self.coarse_to_fine = coarse_to_fine
+        self.coarse_factor = 8            # Coarse pass analyzes every 8th sampled frame (1 s at 24 FPS)
+        self.coarse_min_seconds = 300     # Shorter recordings are analyzed densely throughout
+        
+        # Time budget: calibrate throughput on the first frames, then pick the sampling
+        # density, resolution and detector expected to finish within time_budget seconds
+        self.time_budget = time_budget
+        self.budget_calibration_frames = 8   # Sampled frames timed per candidate setting
+        self.budget_safety = 0.8             # Share of the remaining budget the estimate may use
+        self.budget_fallback_detectors = ('lbp',)  # Cheaper backends tried when their model is available
+        self.budget_reserve_seconds = 2.0    # Kept for building and saving the result
+        self.deadline = None                 # time.time() after which the analysis stops early
+        
+        # Shared pool of warm worker processes (eye_worker_pool.py); None = own processes per analysis
+        self.worker_pool = None
+        self.thread_detectors = []  # Detectors of the pipeline threads, kept for the next range
+        
+        # Reported results stay bounded however long the recording is
+        self.max_reported_movements = 20  # Most severe suspicious movements kept
+        self.max_frame_samples = 50       # Latest detailed frame samples kept for debugging
+        
+        # Pipelined analysis: a decode thread feeds detection threads through a bounded queue
+        # (0 = decode and detect alternate on one thread)
+        self.pipeline_threads = pipeline_threads
+        self.pipeline_queue_size = 8  # Decoded frames waiting for detection
+        
+        # Adaptive rate: only run the full analysis when the scene changes
+        self.adaptive_sampling = adaptive_sampling
+        self.motion_thumbnail_size = (32, 18)  # Tiny gray thumbnail used for the motion check
+        self.motion_threshold = 4.0            # Mean absolute gray-level change that counts as motion
+        self.dense_hold = 4                    # Sampled frames fully analyzed after motion
+        self.max_static_interval = 8           # Full analysis at least every 8 sampled frames
+        self.reference_thumbnail = None        # Thumbnail of the last fully analyzed frame
+        self.last_full_analysis = None
+        self.dense_frames_left = 0
+        self.static_run = 0
+        self.inferred_since_full = 0  # Static frames since the previous centers were measured
+        
+        # Face localization counters reported in the analysis summary
+        self.detection_counts = {
+            'full_detections': 0,
+            'tracked_frames': 0,
+            'window_attempts': 0,
+            'window_hits': 0
+        }
+        
+    def get_center(self, rect):
+        """Get center point of rectangle"""
+        x, y, w, h = rect
+        return (x + w // 2, y + h // 2)
+    
+    def calculate_distance(self, point1, point2):
+        """Calculate Euclidean distance between two points"""
+        if point1 is None or point2 is None:
+            return 0
+        return np.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
+    
+    def detect_eye_in_face(self, face_roi):
+        """Detect eyes within a face region - optimized for performance"""
+        return self.detector.detect_eyes(face_roi)
+    
+    def min_face_side(self, width=None):
+        """Smallest face (analysis pixels) worth detecting: 60px at 640 wide, scaled with max_width"""
+        return max(24, int(round(60 * (width or self.max_width) / 640)))
+    
+    def detect_faces(self, gray):
+        """Run the face detector over the whole frame"""
+        self.detection_counts['full_detections'] += 1
+        side = self.min_face_side()
+        return self.detector.detect_faces(gray, min_size=(side, side))  # Larger minimum for performance
+    
+    def detect_faces_in_window(self, gray):
+        """Run the face cascade only around the previous face, at scales close to its size"""
+        x, y, w, h = self.last_face_box
+        margin_x = int(w * self.search_margin)
+        margin_y = int(h * self.search_margin)
+        
+        window_x1 = max(0, x - margin_x)
+        window_y1 = max(0, y - margin_y)
+        window_x2 = min(gray.shape[1], x + w + margin_x)
+        window_y2 = min(gray.shape[0], y + h + margin_y)
+        window = gray[window_y1:window_y2, window_x1:window_x2]
+        
+        min_side = max(self.min_face_side(), int(min(w, h) / self.search_scale_range))
+        max_side = int(max(w, h) * self.search_scale_range)
+        if window.shape[0] < min_side or window.shape[1] < min_side or max_side < min_side:
+            return []
+        
+        self.detection_counts['window_attempts'] += 1
+        faces = self.detector.detect_faces(window, min_size=(min_side, min_side), max_size=(max_side, max_side))
+        if len(faces) > 0:
+            self.detection_counts['window_hits'] += 1
+        
+        # Back to full analysis frame coordinates
+        return [(fx + window_x1, fy + window_y1, fw, fh) for fx, fy, fw, fh in faces]
+    
+    def track_face(self, gray):
+        """Follow the tracked face box by template matching around its last position
+        
+        Returns the new box, or None when the match is too weak to trust.
+        """
+        x, y, w, h = self.track_box
+        
+        # Search half a face size in every direction
+        search_x1 = max(0, x - w // 2)
+        search_y1 = max(0, y - h // 2)
+        search_x2 = min(gray.shape[1], x + w + w // 2)
+        search_y2 = min(gray.shape[0], y + h + h // 2)
+        search = gray[search_y1:search_y2, search_x1:search_x2]
+        
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+        
+        match = cv2.matchTemplate(search, self.track_template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, location = cv2.minMaxLoc(match)
+        if score < self.tracking_min_confidence:
+            return None
+        
+        return (search_x1 + location[0], search_y1 + location[1], w, h)
+    
+    def locate_faces(self, gray):
+        """Find face boxes in a gray analysis frame
+        
+        Tries, in order: following the tracked face, the predicted search window
+        around the previous face, and finally the full-frame cascade.
+        """
+        faces = []
+        
+        if (self.face_tracking and self.track_box is not None and
+                self.frames_since_detection < self.redetect_interval):
+            box = self.track_face(gray)
+            if box is not None:
+                self.track_box = box
+                self.frames_since_detection += 1
+                self.detection_counts['tracked_frames'] += 1
+                faces = [box]
+        
+        if len(faces) == 0:
+            if self.search_window and self.last_face_box is not None:
+                faces = self.detect_faces_in_window(gray)
+            
+            # Fall back to the whole frame on a miss
+            if len(faces) == 0:
+                faces = self.detect_faces(gray)
+            
+            if self.face_tracking:
+                if len(faces) > 0:
+                    # Template comes from the detection, so tracking cannot drift between detections
+                    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+                    self.track_box = (x, y, w, h)
+                    self.track_template = gray[y:y + h, x:x + w].copy()
+                    self.frames_since_detection = 0
+                else:
+                    self.track_box = None
+                    self.track_template = None
+        
+        self.last_face_box = tuple(max(faces, key=lambda f: f[2] * f[3])) if len(faces) > 0 else None
+        return faces
+    
+    def analyze_frame(self, frame, scale_factor=None):
+        """Analyze a single frame for face and eye detection - optimized
+        
+        Pass scale_factor when the frame was already downscaled by the frame source;
+        movements are still reported in original-resolution pixels.
+        """
+        return self.apply_movement(self.detect_frame(frame, scale_factor))
+    
+    def detect_frame(self, frame, scale_factor=None, detector=None):
+        """Face and eye detection part of analyze_frame, without the movement state
+        
+        Without a detector the configured (possibly stateful) face localization runs.
+        With a detector, faces come from a plain full-frame detection with it, so the
+        call does not depend on earlier frames and can run on any thread.
+        """
+        # Resize frame for faster processing; frames the source already scaled are
+        # only resized again when they are wider than max_width
+        if scale_factor is None:
+            scale_factor = 1.0
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            resize_factor = self.max_width / width
+            frame = cv2.resize(frame, (int(width * resize_factor), int(height * resize_factor)))
+            scale_factor *= resize_factor
+        
+        # Gray frames from the ffmpeg source skip the color conversion
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # Optimize face detection parameters
+        if detector is None:
+            faces = self.locate_faces(gray)
+        else:
+            side = self.min_face_side()
+            faces = detector.detect_faces(gray, min_size=(side, side))
+        
+        detection = {
+            'faces_detected': len(faces),
+            'face_center': None,
+            'eyes_checked': False,
+            'eyes_detected': 0,
+            'eye_centers': None,
+            'frame_scale': scale_factor,
+            'full_detection': detector is not None
+        }
+        
+        if len(faces) > 0:
+            # Use the largest face (most likely the main subject)
+            face = max(faces, key=lambda f: f[2] * f[3])
+            x, y, w, h = face
+            
+            # Adjust coordinates back to original scale
+            if scale_factor != 1.0:
+                x = int(x / scale_factor)
+                y = int(y / scale_factor)
+                w = int(w / scale_factor)
+                h = int(h / scale_factor)
+            
+            # Calculate face center
+            detection['face_center'] = self.get_center((x, y, w, h))
+            
+            # Detect eyes within the face region
+            face_roi_y1 = max(0, int(y * scale_factor))
+            face_roi_y2 = min(gray.shape[0], int((y + h) * scale_factor))
+            face_roi_x1 = max(0, int(x * scale_factor))
+            face_roi_x2 = min(gray.shape[1], int((x + w) * scale_factor))
+            
+            face_roi = gray[face_roi_y1:face_roi_y2, face_roi_x1:face_roi_x2]
+            
+            if face_roi.size > 0:
+                eyes = self.detect_eye_in_face(face_roi) if detector is None else detector.detect_eyes(face_roi)
+                detection['eyes_checked'] = True
+                detection['eyes_detected'] = len(eyes)
+                
+                if len(eyes) >= 2:
+                    # Sort eyes by x-coordinate to get left and right eye
+                    eyes = sorted(eyes, key=lambda e: e[0])
+                    
+                    # Take the two most prominent eyes
+                    eye_centers = []
+                    for eye in eyes[:2]:
+                        ex, ey, ew, eh = eye
+                        # Convert eye coordinates back to full frame coordinates
+                        eye_center_x = face_roi_x1 + ex + ew//2
+                        eye_center_y = face_roi_y1 + ey + eh//2
+                        
+                        if scale_factor != 1.0:
+                            eye_center_x = int(eye_center_x / scale_factor)
+                            eye_center_y = int(eye_center_y / scale_factor)
+                        
+                        eye_centers.append((eye_center_x, eye_center_y))
+                    detection['eye_centers'] = eye_centers
+        
+        return detection
+    
+    def movement_scale(self):
+        """Sampling gap in units of movement_frame_gap (above 1 when a time budget thinned it)"""
+        return self.analysis_frame_skip / self.movement_frame_gap
+    
+    def apply_movement(self, detection):
+        """Turn a frame's detections into its analysis, comparing with the previous frame
+        
+        After static frames the previous centers are several samples old, and a time
+        budget may sample more sparsely than movement_frame_gap; movement is then
+        averaged over the gap so the per-sample thresholds still apply.
+        """
+        samples = (self.inferred_since_full + 1) * self.movement_scale()
+        self.inferred_since_full = 0
+        analysis_result = {
+            'faces_detected': detection['faces_detected'],
+            'face_movement': 0,
+            'eye_movement': 0,
+            'looking_away': False,
+            'eyes_detected': detection['eyes_detected'],
+            'frame_scale': detection['frame_scale']
+        }
+        
+        if detection['faces_detected'] > 0:
+            face_center = detection['face_center']
+            
+            # Calculate face movement
+            if self.prev_face_center is not None:
+                face_movement = self.calculate_distance(face_center, self.prev_face_center) / samples
+                analysis_result['face_movement'] = face_movement
+                
+                # Detect if face moved significantly (potential looking away)
+                if face_movement > self.face_movement_threshold:
+                    analysis_result['looking_away'] = True
+            
+            self.prev_face_center = face_center
+            
+            if detection['eyes_checked']:
+                eye_centers = detection['eye_centers']
+                
+                # Analyze eye movement if eyes are detected
+                if eye_centers is not None:
+                    # Calculate eye movement
+                    if self.prev_eye_centers is not None and len(self.prev_eye_centers) == len(eye_centers):
+                        total_eye_movement = 0
+                        for i, (current, previous) in enumerate(zip(eye_centers, self.prev_eye_centers)):
+                            movement = self.calculate_distance(current, previous)
+                            total_eye_movement += movement
+                        
+                        avg_eye_movement = total_eye_movement / len(eye_centers) / samples
+                        analysis_result['eye_movement'] = avg_eye_movement
+                        
+                        # Detect significant eye movement
+                        if avg_eye_movement > self.eye_movement_threshold:
+                            analysis_result['looking_away'] = True
+                    
+                    self.prev_eye_centers = eye_centers
+                else:
+                    # If eyes are not detected, consider it as looking away
+                    analysis_result['looking_away'] = True
+                    self.prev_eye_centers = None
+        else:
+            # No face detected - definitely looking away
+            analysis_result['looking_away'] = True
+            self.prev_face_center = None
+            self.prev_eye_centers = None
+        
+        return analysis_result
+    
+    
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = create_detector(self.detector_name, self.model_dir)
+        return self._detector
+    
+    @detector.setter
+    def detector(self, detector):
+        self._detector = detector
+    
+    def get_settings(self):
+        """Constructor arguments needed to rebuild an equivalent tracker in a worker process"""
+        return {
+            'analysis_frame_skip': self.analysis_frame_skip,
+            'sampling_mode': self.sampling_mode,
+            'frame_source': self.frame_source,
+            'face_tracking': self.face_tracking,
+            'search_window': self.search_window,
+            'adaptive_sampling': self.adaptive_sampling,
+            'detector': self.detector_name,
+            'model_dir': self.model_dir,
+            'use_proxy': self.use_proxy,
+            'use_index': self.use_index,
+            'pipeline_threads': self.pipeline_threads,
+            'coarse_to_fine': self.coarse_to_fine,
+            'max_width': self.max_width,
+            'movement_frame_gap': self.movement_frame_gap
+        }
+    
+    def cache_params(self):
+        """Everything besides the recording that determines the analysis result"""
+        params = self.get_settings()
+        params['time_budget'] = self.time_budget
+        params['scoring'] = DEFAULT_SCORING
+        return params
+    
+    def new_range_stats(self):
+        """Empty counters for a range of analyzed frames"""
+        return {
+            'total_analyzed_frames': 0,
+            'looking_away_frames': 0,
+            'no_face_frames': 0,
+            'movements': MovementAggregator(self.max_reported_movements),
+            'detailed_analysis': deque(maxlen=self.max_frame_samples),
+            'timeline': TimelineRecorder(),
+            'detection_counts': {},
+            'frame_analysis_seconds': 0.0,
+            'full_analyses': 0,
+            'pipeline': {
+                'detection_threads': 0,
+                'wall_seconds': 0.0,
+                'decode_seconds': 0.0,
+                'detection_seconds': 0.0,
+                'reassembly_seconds': 0.0,
+                'queue_depth_total': 0,
+                'queue_samples': 0,
+                'max_queue_depth': 0
+            },
+            'last_frame': 0,
+            'covered_frames': 0,  # Frames the range got through (summed over ranges, unlike last_frame)
+            'stopped_at_deadline': False,
+            # Boundary state used to stitch adjacent ranges together
+            'first_frame': None,
+            'prev_face_center': None,
+            'prev_eye_centers': None
+        }
+    
+    def is_suspicious(self, frame_analysis):
+        """Check whether a looking-away frame should be recorded as a suspicious movement"""
+        return (frame_analysis['looking_away'] and
+                (frame_analysis['face_movement'] > self.face_movement_threshold or
+                 frame_analysis['eye_movement'] > self.eye_movement_threshold or
+                 frame_analysis['faces_detected'] == 0))
+    
+    def movement_data(self, frame_analysis):
+        """Build a suspicious movement record from a frame analysis"""
+        return {
+            'timestamp': frame_analysis['timestamp'],
+            'face_movement': frame_analysis['face_movement'],
+            'eye_movement': frame_analysis['eye_movement'],
+            'faces_detected': frame_analysis['faces_detected'],
+            'eyes_detected': frame_analysis['eyes_detected'],
+            'type': 'suspicious_behavior'
+        }
+    
+    def needs_full_analysis(self, frame):
+        """Cheap motion check deciding whether a sampled frame gets the full Haar analysis"""
+        thumbnail = cv2.resize(frame, self.motion_thumbnail_size, interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 3:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        
+        # The reference is only set on frames that get the full analysis, so a
+        # static frame always has a full analysis to copy from
+        if self.reference_thumbnail is None:
+            motion = True
+        else:
+            motion = cv2.absdiff(thumbnail, self.reference_thumbnail).mean() > self.motion_threshold
+        
+        if motion:
+            # Sample densely around the motion
+            self.dense_frames_left = self.dense_hold
+        elif self.dense_frames_left > 0:
+            self.dense_frames_left -= 1
+        elif self.static_run + 1 < self.max_static_interval:
+            self.static_run += 1
+            return False
+        
+        self.reference_thumbnail = thumbnail
+        self.static_run = 0
+        return True
+    
+    def infer_static_frame(self):
+        """Analysis for a frame skipped as static: same face/eye state as the last full analysis, no movement"""
+        last = self.last_full_analysis
+        self.inferred_since_full += 1
+        return {
+            'faces_detected': last['faces_detected'],
+            'face_movement': 0,
+            'eye_movement': 0,
+            'looking_away': last['faces_detected'] == 0 or last['eyes_detected'] < 2,
+            'eyes_detected': last['eyes_detected'],
+            'frame_scale': last['frame_scale'],
+            'inferred': True
+        }
+    
+    def record_frame(self, stats, frame_analysis, frame_count, fps):
+        """Add one analyzed frame to the range counters"""
+        timestamp = frame_count / fps if fps > 0 else frame_count
+        
+        # Record detailed analysis (sample for efficiency)
+        frame_analysis['timestamp'] = timestamp
+        frame_analysis['frame_number'] = frame_count
+        
+        stats['total_analyzed_frames'] += 1
+        stats['timeline'].append(frame_analysis)
+        stats['movements'].add_frame(frame_analysis['face_movement'], frame_analysis['eye_movement'])
+        
+        if stats['first_frame'] is None:
+            # Centers of the first frame are needed to recompute its movement
+            # once the state at the end of the preceding range is known
+            stats['first_frame'] = {
+                'analysis': frame_analysis,
+                'face_center': self.prev_face_center,
+                'eye_centers': self.prev_eye_centers
+            }
+        
+        # Only store every 10th analysis for memory efficiency
+        # (indexed by global sample number so every range samples the same frames)
+        if (frame_count // self.analysis_frame_skip) % 10 == 0:
+            stats['detailed_analysis'].append(frame_analysis)
+        
+        # Count suspicious behavior
+        if frame_analysis['looking_away']:
+            stats['looking_away_frames'] += 1
+            
+            # Record significant movements
+            if self.is_suspicious(frame_analysis):
+                stats['movements'].add_event(self.movement_data(frame_analysis))
+        
+        if frame_analysis['faces_detected'] == 0:
+            stats['no_face_frames'] += 1
+    
+    def find_proxy(self, video_path):
+        """Info of the recording's analysis proxy when enabled and usable, else None"""
+        if not self.use_proxy:
+            return None
+        return load_proxy_info(video_path, self.analysis_frame_skip)
+    
+    def find_index(self, video_path):
+        """Frame index of the recording's seekable copy when enabled and usable, else None"""
+        if not self.use_index:
+            return None
+        return load_recording_index(video_path)
+    
+    def open_frame_source(self, video_path, start_frame=0, end_frame=None, frame_skip=None):
+        """Create the configured frame source for a frame range
+        
+        frame_skip defaults to the analysis frame skip; a multiple of it keeps the
+        sampled frames on the same grid (used by the coarse pass).
+        """
+        frame_skip = frame_skip or self.analysis_frame_skip
+        proxy = self.find_proxy(video_path)
+        if proxy is not None:
+            return ProxyFrameSource(proxy, start_frame, end_frame, self.frame_source,
+                                    frame_skip // proxy['frame_step'])
+        index = self.find_index(video_path)
+        if index is not None:
+            return IndexedFrameSource(index, frame_skip, start_frame, end_frame, self.frame_source, self.sampling_mode)
+        if self.frame_source == 'ffmpeg':
+            return FFmpegGrayFrameSource(video_path, frame_skip, start_frame, end_frame, self.max_width)
+        return OpenCVFrameSource(video_path, frame_skip, start_frame, end_frame, self.sampling_mode)
+    
+    def analyze_sampled_frame(self, stats, frame_count, frame, scale_factor, fps):
+        """Analyze (or infer, when static) one sampled frame and add it to the counters"""
+        if self.adaptive_sampling and not self.needs_full_analysis(frame):
+            frame_analysis = self.infer_static_frame()
+        else:
+            frame_start = time.perf_counter()
+            frame_analysis = self.analyze_frame(frame, scale_factor)
+            stats['frame_analysis_seconds'] += time.perf_counter() - frame_start
+            stats['full_analyses'] += 1
+            self.last_full_analysis = frame_analysis
+        
+        self.record_frame(stats, frame_analysis, frame_count, fps)
+        return frame_analysis
+    
+    def analyze_range(self, video_path, start_frame=0, end_frame=None, total_frames=0):
+        """Analyze frames [start_frame, end_frame) of a video and return the raw counters
+        
+        Frame numbers are global, so the sampling grid matches a serial run over
+        the whole video. end_frame=None reads until the end of the file.
+        """
+        stats = self.new_range_stats()
+        
+        with self.open_frame_source(video_path, start_frame, end_frame) as source:
+            self.analyze_source(stats, source, source.fps, total_frames)
+            self.close_range(stats, source.last_frame, start_frame)
+        
+        return stats
+    
+    def analyze_source(self, stats, source, fps, total_frames=0):
+        """Analyze every sampled frame of an open frame source into stats"""
+        if self.pipeline_threads > 0:
+            self.analyze_source_pipelined(stats, source, fps, total_frames)
+        else:
+            # Optimized frame analysis - analyze every 3rd frame for 24 FPS (effective 8 FPS analysis)
+            for frame_count, frame, scale_factor in source:
+                if self.past_deadline(stats):
+                    break
+                self.analyze_sampled_frame(stats, frame_count, frame, scale_factor, fps)
+                self.report_progress(stats, frame_count, total_frames)
+    
+    def past_deadline(self, stats):
+        """Check the time budget deadline, flagging the range as cut short once it has passed"""
+        if self.deadline is None or time.time() < self.deadline:
+            return False
+        stats['stopped_at_deadline'] = True
+        return True
+    
+    def reset_for_job(self):
+        """Clear everything left by the previous analysis so a warm tracker can be reused"""
+        self.reset_frame_state()
+        self.detection_counts = {key: 0 for key in self.detection_counts}
+        self.deadline = None
+    
+    def reset_frame_state(self):
+        """Forget the previous frame (movement, tracking and motion references) before a discontinuity"""
+        self.prev_face_center = None
+        self.prev_eye_centers = None
+        self.track_box = None
+        self.track_template = None
+        self.frames_since_detection = 0
+        self.last_face_box = None
+        self.reference_thumbnail = None
+        self.last_full_analysis = None
+        self.dense_frames_left = 0
+        self.static_run = 0
+        self.inferred_since_full = 0
+    
+    def coarse_pass(self, video_path):
+        """Analyze every coarse_factor-th sampled frame; returns (samples, last decoded frame)
+        
+        Each sample is (frame_number, faces_detected, eyes_detected, frame_scale, flagged).
+        A sample is flagged when it looks away (no face, fewer than two eyes or a
+        movement above threshold since the previous coarse sample) or when more
+        than one face is found, since unstable localization shows up as movement
+        in the dense analysis.
+        """
+        samples = []
+        self.reset_frame_state()
+        with self.open_frame_source(video_path, frame_skip=self.analysis_frame_skip * self.coarse_factor) as source:
+            for frame_count, frame, scale_factor in source:
+                frame_analysis = self.analyze_frame(frame, scale_factor)
+                samples.append((frame_count, frame_analysis['faces_detected'], frame_analysis['eyes_detected'],
+                                frame_analysis['frame_scale'],
+                                frame_analysis['looking_away'] or frame_analysis['faces_detected'] > 1))
+            last_frame = source.last_frame
+        self.reset_frame_state()
+        return samples, last_frame
+    
+    def plan_fine_windows(self, samples):
+        """Merged (start_frame, end_frame) ranges reaching one coarse step around every flagged sample"""
+        coarse_step = self.analysis_frame_skip * self.coarse_factor
+        windows = []
+        for frame_count, _, _, _, flagged in samples:
+            if not flagged:
+                continue
+            start, end = max(0, frame_count - coarse_step), frame_count + coarse_step
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+        return windows
+    
+    def fill_calm_frames(self, stats, samples, sample_frames, start_frame, end_frame, fps):
+        """Record the sampled frames of a calm stretch as inferred copies of the coarse samples
+        
+        Every coarse sample bordering a calm stretch showed a face and both eyes, so
+        its frames are recorded with that state and no movement.
+        """
+        skip = self.analysis_frame_skip
+        frame_count = (start_frame // skip + 1) * skip
+        position = max(0, bisect_right(sample_frames, frame_count) - 1)
+        while frame_count <= end_frame:
+            # Latest coarse sample at or before this frame (the first one at the start)
+            while position + 1 < len(samples) and samples[position + 1][0] <= frame_count:
+                position += 1
+            _, faces, eyes, frame_scale, _ = samples[position]
+            self.record_frame(stats, {
+                'faces_detected': faces,
+                'face_movement': 0,
+                'eye_movement': 0,
+                'looking_away': faces == 0 or eyes < 2,
+                'eyes_detected': eyes,
+                'frame_scale': frame_scale,
+                'inferred': True
+            }, frame_count, fps)
+            frame_count += skip
+    
+    def analyze_coarse_to_fine(self, video_path, fps, total_frames=0):
+        """Two-pass analysis: coarse pass over the whole video, dense pass inside flagged windows only"""
+        samples, last_frame = self.coarse_pass(video_path)
+        stats = self.new_range_stats()
+        if not samples:
+            return stats
+        
+        windows = self.plan_fine_windows(samples)
+        sample_frames = [sample[0] for sample in samples]
+        print(f"Coarse pass: {len(samples)} frames, {sum(s[4] for s in samples)} flagged, "
+              f"{len(windows)} windows for the dense pass")
+        
+        position = 0
+        dense_frames = 0
+        for start_frame, end_frame in windows:
+            end_frame = min(end_frame, last_frame)
+            self.fill_calm_frames(stats, samples, sample_frames, position, start_frame, fps)
+            # Windows are not contiguous: movement and tracking restart in each one
+            self.reset_frame_state()
+            with self.open_frame_source(video_path, start_frame, end_frame) as source:
+                self.analyze_source(stats, source, fps, total_frames)
+            dense_frames += end_frame - start_frame
+            position = end_frame
+        self.fill_calm_frames(stats, samples, sample_frames, position, last_frame, fps)
+        
+        stats['coarse_to_fine'] = {
+            'coarse_frames': len(samples),
+            'flagged_coarse_frames': sum(s[4] for s in samples),
+            'fine_windows': len(windows),
+            'dense_frames': dense_frames,
+            'total_frames': last_frame
+        }
+        self.close_range(stats, last_frame)
+        return stats
+    
+    def report_progress(self, stats, frame_count, total_frames):
+        # Progress indicator (less frequent for performance)
+        if total_frames > 0 and stats['total_analyzed_frames'] % 50 == 0:
+            progress = (frame_count / total_frames) * 100
+            print(f"Analysis progress: {progress:.1f}% ({stats['total_analyzed_frames']} frames analyzed)")
+    
+    def record_detection(self, stats, frame_count, detection, detection_seconds, fps):
+        """Pipeline counterpart of analyze_sampled_frame; detection is None for static frames"""
+        if detection is None:
+            frame_analysis = self.infer_static_frame()
+        else:
+            if detection['full_detection']:
+                self.detection_counts['full_detections'] += 1
+            frame_analysis = self.apply_movement(detection)
+            stats['frame_analysis_seconds'] += detection_seconds
+            stats['full_analyses'] += 1
+            self.last_full_analysis = frame_analysis
+        
+        self.record_frame(stats, frame_analysis, frame_count, fps)
+    
+    def analyze_source_pipelined(self, stats, source, fps, total_frames=0):
+        """Analyze a frame source with a decode thread and pipeline_threads detection threads
+        
+        decode -> [bounded frame queue] -> detection threads -> [result queue] -> this thread
+        
+        The decode thread also makes the (ordered) adaptive sampling decision. Results
+        are reassembled in frame order here before the movement state is updated, so
+        the counters match a serial run. Face tracking and the search window depend
+        on the previous frame's face, so with either enabled a single detection
+        thread runs; decode still overlaps with it. Otherwise every detection thread
+        uses its own detector instance.
+        """
+        stateless = not (self.face_tracking or self.search_window)
+        thread_count = detection_thread_count(self.pipeline_threads, self.face_tracking, self.search_window)
+        while stateless and len(self.thread_detectors) < thread_count:
+            self.thread_detectors.append(create_detector(self.detector_name, self.model_dir))
+        detectors = self.thread_detectors[:thread_count] if stateless else [None]
+        
+        frames = queue.Queue(maxsize=self.pipeline_queue_size)
+        results = queue.Queue()
+        stop = threading.Event()
+        errors = []
+        timing = stats['pipeline']
+        timing_lock = threading.Lock()
+        
+        def put_frame(item):
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def decode():
+            busy = 0.0
+            try:
+                sequence = 0
+                iterator = iter(source)
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        frame_count, frame, scale_factor = next(iterator)
+                    except StopIteration:
+                        break
+                    if self.past_deadline(stats):
+                        break
+                    static = self.adaptive_sampling and not self.needs_full_analysis(frame)
+                    busy += time.perf_counter() - start
+                    
+                    depth = frames.qsize()
+                    timing['queue_depth_total'] += depth
+                    timing['queue_samples'] += 1
+                    timing['max_queue_depth'] = max(timing['max_queue_depth'], depth)
+                    if not put_frame((sequence, frame_count, None if static else frame, scale_factor)):
+                        break
+                    sequence += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                timing['decode_seconds'] += busy
+                for _ in range(thread_count):
+                    put_frame(None)
+        
+        def detect(detector):
+            busy = 0.0
+            try:
+                while True:
+                    try:
+                        item = frames.get(timeout=0.1)
+                    except queue.Empty:
+                        if stop.is_set():
+                            break
+                        continue
+                    if item is None:
+                        break
+                    
+                    sequence, frame_count, frame, scale_factor = item
+                    detection, seconds = None, 0.0
+                    if frame is not None:
+                        start = time.perf_counter()
+                        detection = self.detect_frame(frame, scale_factor, detector)
+                        seconds = time.perf_counter() - start
+                        busy += seconds
+                    results.put((sequence, frame_count, detection, seconds))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                with timing_lock:
+                    timing['detection_seconds'] += busy
+                results.put(None)
+        
+        threads = [threading.Thread(target=decode, daemon=True)]
+        threads += [threading.Thread(target=detect, args=(detector,), daemon=True) for detector in detectors]
+        
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        
+        # Ordered reassembly: movement state must see frames in video order
+        pending = {}
+        next_sequence = 0
+        finished = 0
+        try:
+            while finished < thread_count:
+                item = results.get()
+                if item is None:
+                    finished += 1
+                    continue
+                pending[item[0]] = item
+                
+                while next_sequence in pending:
+                    _, frame_count, detection, seconds = pending.pop(next_sequence)
+                    start = time.perf_counter()
+                    self.record_detection(stats, frame_count, detection, seconds, fps)
+                    timing['reassembly_seconds'] += time.perf_counter() - start
+                    next_sequence += 1
+                    self.report_progress(stats, frame_count, total_frames)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        
+        timing['wall_seconds'] += time.perf_counter() - wall_start
+        timing['detection_threads'] = thread_count
+        if errors:
+            raise errors[0]
+    
+    def close_range(self, stats, last_frame, start_frame=0):
+        """Store the end-of-range state needed to merge this range with the next one"""
+        stats['last_frame'] = last_frame
+        stats['covered_frames'] = max(0, last_frame - start_frame)
+        stats['detection_counts'] = dict(self.detection_counts)
+        stats['prev_face_center'] = self.prev_face_center
+        stats['prev_eye_centers'] = self.prev_eye_centers
+    
+    def stitch_range(self, stats, prev_face_center, prev_eye_centers):
+        """Recompute the first frame of a range using the state left by the preceding range
+        
+        A range starts without previous centers, so its first frame reports zero
+        movement. Re-evaluating it against the real previous centers makes the
+        merged counters identical to a serial run.
+        """
+        first = stats['first_frame']
+        if first is None:
+            return
+        
+        frame_analysis = first['analysis']
+        if frame_analysis['faces_detected'] == 0:
+            return
+        
+        was_looking_away = frame_analysis['looking_away']
+        was_suspicious = self.is_suspicious(frame_analysis)
+        old_movement = (frame_analysis['face_movement'], frame_analysis['eye_movement'])
+        
+        if prev_face_center is not None and first['face_center'] is not None:
+            face_movement = self.calculate_distance(first['face_center'], prev_face_center) / self.movement_scale()
+            frame_analysis['face_movement'] = face_movement
+            if face_movement > self.face_movement_threshold:
+                frame_analysis['looking_away'] = True
+        
+        eye_centers = first['eye_centers']
+        if (eye_centers is not None and prev_eye_centers is not None and
+                len(prev_eye_centers) == len(eye_centers)):
+            total_eye_movement = 0
+            for current, previous in zip(eye_centers, prev_eye_centers):
+                total_eye_movement += self.calculate_distance(current, previous)
+            
+            avg_eye_movement = total_eye_movement / len(eye_centers) / self.movement_scale()
+            frame_analysis['eye_movement'] = avg_eye_movement
+            if avg_eye_movement > self.eye_movement_threshold:
+                frame_analysis['looking_away'] = True
+        
+        if frame_analysis['looking_away'] and not was_looking_away:
+            stats['looking_away_frames'] += 1
+        
+        stats['timeline'].set_row(0, frame_analysis)
+        stats['movements'].update_frame(old_movement, (frame_analysis['face_movement'], frame_analysis['eye_movement']))
+        
+        if self.is_suspicious(frame_analysis) and not was_suspicious:
+            stats['movements'].add_event(self.movement_data(frame_analysis))
+    
+    def merge_range_stats(self, ranges):
+        """Merge per-range counters (in video order) into one set of counters"""
+        merged = self.new_range_stats()
+        previous_stopped = False
+        
+        for stats in ranges:
+            # A range cut short by the deadline leaves a gap; movement is not measured across it
+            if merged['total_analyzed_frames'] > 0 and not previous_stopped:
+                self.stitch_range(stats, merged['prev_face_center'], merged['prev_eye_centers'])
+            previous_stopped = stats['stopped_at_deadline']
+            
+            merged['total_analyzed_frames'] += stats['total_analyzed_frames']
+            merged['looking_away_frames'] += stats['looking_away_frames']
+            merged['no_face_frames'] += stats['no_face_frames']
+            merged['movements'].merge(stats['movements'])
+            merged['detailed_analysis'].extend(stats['detailed_analysis'])
+            merged['timeline'].extend(stats['timeline'])
+            merged['frame_analysis_seconds'] += stats['frame_analysis_seconds']
+            for key, value in stats['pipeline'].items():
+                if key in ('detection_threads', 'max_queue_depth'):
+                    merged['pipeline'][key] = max(merged['pipeline'][key], value)
+                else:
+                    merged['pipeline'][key] += value
+            merged['full_analyses'] += stats['full_analyses']
+            for key, count in stats['detection_counts'].items():
+                merged['detection_counts'][key] = merged['detection_counts'].get(key, 0) + count
+            merged['last_frame'] = max(merged['last_frame'], stats['last_frame'])
+            merged['covered_frames'] += stats['covered_frames']
+            merged['stopped_at_deadline'] = merged['stopped_at_deadline'] or stats['stopped_at_deadline']
+            
+            if merged['first_frame'] is None:
+                merged['first_frame'] = stats['first_frame']
+            
+            # A range without analyzed frames leaves the boundary state untouched
+            if stats['total_analyzed_frames'] > 0:
+                merged['prev_face_center'] = stats['prev_face_center']
+                merged['prev_eye_centers'] = stats['prev_eye_centers']
+        
+        return merged
+    
+    def plan_segments(self, total_frames, fps):
+        """Split the video into (start_frame, end_frame) ranges, one per worker"""
+        if self.workers <= 1 or total_frames <= 0 or fps <= 0:
+            return [(0, None)]
+        
+        duration = total_frames / fps
+        segment_count = min(self.workers, int(duration // self.min_segment_seconds))
+        if segment_count <= 1:
+            return [(0, None)]
+        
+        segment_frames = total_frames // segment_count
+        bounds = [i * segment_frames for i in range(segment_count)]
+        # The last range reads to the end of the file in case the frame count is short
+        return [(start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+    
+    def plan_question_segments(self, question_timings, total_frames, fps):
+        """Split the video at the question start times, one range per question window
+        
+        Frames before the first question form their own range, so the merged
+        counters still cover the whole recording.
+        """
+        if self.workers <= 1 or total_frames <= 0 or fps <= 0 or not question_timings:
+            return [(0, None)]
+        
+        starts = {int(round(float(t.get('timeFromStart', 0)) * fps)) for t in question_timings}
+        bounds = [0] + sorted(b for b in starts if 0 < b < total_frames)
+        return [(start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+    
+    def range_time_limit(self, segment_count, concurrency):
+        """Seconds each range may run before the deadline, or None without a deadline
+        
+        Ranges beyond the concurrency wait in the queue, so the time left is shared
+        between the waves of ranges; each range counts its share from its own start.
+        """
+        if self.deadline is None:
+            return None
+        waves = -(-segment_count // max(1, concurrency))
+        return max(0.0, self.deadline - time.time()) / waves
+    
+    def analyze_segments_parallel(self, video_path, segments):
+        """Analyze each range in its own process and return the per-range counters in order"""
+        settings = self.get_settings()
+        if self.worker_pool is not None:
+            time_limit = self.range_time_limit(len(segments), self.worker_pool.processes)
+            futures = [self.worker_pool.submit_range(video_path, start, end, settings, time_limit)
+                       for start, end in segments]
+            return [future.result() for future in futures]
+        
+        # Spawned workers only import this module, not the Flask app
+        context = multiprocessing.get_context('spawn')
+        max_workers = min(len(segments), self.workers)
+        time_limit = self.range_time_limit(len(segments), max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_analyze_segment, video_path, start, end, settings, time_limit)
+                for start, end in segments
+            ]
+            return [future.result() for future in futures]
+    
+    def calibrate_throughput(self, video_path, detectors, widths):
+        """Time decoding and detection on the first sampled frames
+        
+        Returns (decode seconds per source frame, {(detector, width): detection
+        seconds per sampled frame}). Detection is timed as a full-frame detection,
+        an upper bound for the tracked and static frames.
+        """
+        frames = []
+        first_frame = None
+        with self.open_frame_source(video_path, 0, (self.budget_calibration_frames + 1) * self.analysis_frame_skip) as source:
+            for frame_count, frame, scale_factor in source:
+                if first_frame is None:
+                    # Timed from the first frame on, so decoder startup is not spread over the frames
+                    first_frame, start = frame_count, time.perf_counter()
+                frames.append((frame, scale_factor))
+            decoded_frames = source.last_frame - (first_frame or 0)
+            decode_cost = (time.perf_counter() - start) / decoded_frames if decoded_frames > 0 else 0
+        if not frames:
+            raise Exception("No frames could be decoded for calibration")
+        
+        detect_costs = {}
+        configured_width = self.max_width
+        try:
+            for name, detector in detectors.items():
+                for width in widths:
+                    self.max_width = width
+                    start = time.perf_counter()
+                    for frame, scale_factor in frames:
+                        self.detect_frame(frame, scale_factor, detector)
+                    detect_costs[(name, width)] = (time.perf_counter() - start) / len(frames)
+        finally:
+            self.max_width = configured_width
+        return decode_cost, detect_costs
+    
+    def calibrate_detectors(self, video_path, names, widths):
+        """calibrate_throughput for the named detector backends that can be loaded
+        
+        Returns (available names, decode cost, detection costs); backends other than
+        the tracker's own are kept in spare_detectors for the next calibration.
+        """
+        detectors = {}
+        for name in names:
+            if name == self.detector_name:
+                detectors[name] = self.detector
+                continue
+            if name not in self.spare_detectors:
+                try:
+                    self.spare_detectors[name] = create_detector(name, self.model_dir)
+                except Exception as e:
+                    print(f"Detector {name} not available for the time budget: {e}")
+                    self.spare_detectors[name] = None  # Not retried on later calibrations
+            if self.spare_detectors[name] is not None:
+                detectors[name] = self.spare_detectors[name]
+        decode_cost, detect_costs = self.calibrate_throughput(video_path, detectors, widths)
+        return list(detectors), decode_cost, detect_costs
+    
+    def plan_time_budget(self, video_path, total_frames, fps, started):
+        """Pick the most accurate TIME_BUDGET_LADDER setting expected to finish within the budget
+        
+        The chosen frame skip, width and detector are applied to the tracker and the
+        deadline is set; returns the plan reported under 'time_budget'. Movement stays
+        measured against movement_frame_gap, so a thinned skip does not raise the flags.
+        """
+        names = [self.detector_name] + [name for name in self.budget_fallback_detectors if name != self.detector_name]
+        widths = sorted({min(width, self.max_width) for _, width, _ in TIME_BUDGET_LADDER}, reverse=True)
+        if self.worker_pool is not None:
+            # Calibrate on a warm worker, which already holds the detectors
+            names, decode_cost, detect_costs = self.worker_pool.submit_calibration(
+                video_path, self.get_settings(), names, widths).result()
+        else:
+            names, decode_cost, detect_costs = self.calibrate_detectors(video_path, names, widths)
+        fallback = next((name for name in names if name != self.detector_name), None)
+        
+        ladder = []
+        for skip_multiple, width, use_fallback in TIME_BUDGET_LADDER:
+            option = (self.analysis_frame_skip * skip_multiple, min(width, self.max_width),
+                      fallback if use_fallback and fallback else self.detector_name)
+            if option not in ladder:
+                ladder.append(option)
+        
+        
+        # Parallel segments share the work; more workers than cores do not help
+        parallelism = max(1, min(len(self.plan_segments(total_frames, fps)), os.cpu_count() or 1))
+        def estimate(option):
+            skip, width, name = option
+            return (total_frames * decode_cost + (total_frames / skip) * detect_costs[(name, width)]) / parallelism
+        
+        calibration_seconds = time.time() - started
+        available = (self.time_budget - calibration_seconds - self.budget_reserve_seconds) * self.budget_safety
+        chosen = next((option for option in ladder if estimate(option) <= available), ladder[-1])
+        
+        baseline = ladder[0]
+        skip, width, name = chosen
+        self.analysis_frame_skip = skip
+        self.max_width = width
+        if name != self.detector_name:
+            self.detector_name = name
+            self.detector = self.spare_detectors.get(name)  # Not loaded here: loads on first use
+        self.deadline = started + self.time_budget - self.budget_reserve_seconds
+        
+        print(f"Time budget {self.time_budget}s: frame skip {skip}, width {width}, detector {name} "
+              f"(estimated {estimate(chosen):.1f}s, calibration {calibration_seconds:.1f}s)")
+        if estimate(chosen) > available:
+            print("No setting fits the time budget - using the cheapest, the analysis stops at the deadline")
+        return {
+            'budget_seconds': self.time_budget,
+            'calibration_seconds': calibration_seconds,
+            'decode_ms_per_frame': decode_cost * 1000,
+            'estimated_seconds': estimate(chosen),
+            'baseline_estimated_seconds': estimate(baseline),
+            'settings': {'frame_skip': skip, 'max_width': width, 'detector': name},
+            'movement_scale': self.movement_scale(),
+            'baseline_settings': {'frame_skip': baseline[0], 'max_width': baseline[1], 'detector': baseline[2]},
+            'expected_within_budget': estimate(chosen) <= available
+        }
+    
+    def summarize_time_budget(self, plan, stats, total_frames, started):
+        """Report the budget outcome and the confidence lost against the baseline settings
+        
+        Confidence loss is reported as measurable quantities: the share of the
+        baseline's analyzed frames, the worst-case 95% margin of error of the
+        frame percentages with and without the budget, the analysis resolution
+        relative to the baseline, and how much of the video was covered.
+        """
+        def margin(frames):
+            # Worst case (p = 0.5) of a sampled proportion, in percentage points
+            return 1.96 * np.sqrt(0.25 / frames) * 100 if frames > 0 else None
+        
+        baseline = plan['baseline_settings']
+        analyzed = stats['total_analyzed_frames']
+        baseline_frames = total_frames // baseline['frame_skip'] if total_frames > 0 else analyzed
+        elapsed = time.time() - started
+        
+        report = dict(plan)
+        report.update({
+            'elapsed_seconds': elapsed,
+            'within_budget': elapsed <= self.time_budget,
+            'stopped_at_deadline': stats['stopped_at_deadline'],
+            # Results of another plan than the configured settings are not cached
+            'degraded': stats['stopped_at_deadline'] or plan['settings'] != plan['baseline_settings'],
+            'coverage_percentage': min(100, (stats['covered_frames'] / total_frames) * 100) if total_frames > 0 else 100,
+            'confidence_loss': {
+                'sampled_fraction': analyzed / baseline_frames if baseline_frames else 1,
+                'margin_of_error_pct': margin(analyzed),
+                'baseline_margin_of_error_pct': margin(baseline_frames),
+                'resolution_fraction': self.max_width / baseline['max_width'],
+                'detector_changed': plan['settings']['detector'] != baseline['detector']
+            }
+        })
+        return report
+    
+    def analyze_video_for_cheating(self, video_path, output_dir, question_timings=None):
+        """Analyze 24 FPS video for eye movement and detect potential cheating
+        
+        With question_timings (from session_info.json) the recording is split into
+        per-question windows that are analyzed concurrently, and the result gets a
+        per-question integrity breakdown. With a time_budget the settings are chosen
+        to finish within it (see plan_time_budget).
+        """
+        started = time.time()
+        try:
+            # Video properties (the proxy records those of the original; the frame
+            # index counts the frames of recordings without a usable header)
+            proxy = self.find_proxy(video_path)
+            index = self.find_index(video_path) if proxy is None else None
+            if proxy is not None:
+                fps, total_frames = proxy['source_fps'], proxy['source_total_frames']
+                print(f"Using analysis proxy {proxy['width']}x{proxy['height']} ({proxy['proxy_frames']} frames)")
+            elif index is not None:
+                fps, total_frames = index['fps'], index['frame_count']
+                print(f"Using seekable copy with frame index ({index['keyframes']} keyframes)")
+            else:
+                _, _, fps, total_frames = probe_video(video_path)
+            duration = total_frames / fps if fps > 0 else 0
+            
+            print(f"Starting optimized video analysis: {total_frames} frames at {fps:.1f} FPS, {duration:.2f} seconds")
+            
+            budget_plan = None
+            if self.time_budget:
+                budget_plan = self.plan_time_budget(video_path, total_frames, fps, started)
+            
+            segments = [(0, None)]
+            coarse_to_fine = self.coarse_to_fine and duration >= self.coarse_min_seconds
+            if coarse_to_fine:
+                print("Analyzing with a coarse pass and dense windows")
+            else:
+                segments = self.plan_question_segments(question_timings, total_frames, fps)
+            if len(segments) > 1:
+                print(f"Analyzing {len(segments)} question windows with {min(len(segments), self.workers)} workers")
+            elif not coarse_to_fine:
+                segments = self.plan_segments(total_frames, fps)
+                if len(segments) > 1:
+                    print(f"Analyzing {len(segments)} segments in parallel")
+            
+            if coarse_to_fine:
+                stats = self.analyze_coarse_to_fine(video_path, fps, total_frames)
+            elif len(segments) > 1:
+                stats = self.merge_range_stats(self.analyze_segments_parallel(video_path, segments))
+            elif self.worker_pool is not None:
+                # Even a single range runs on a warm worker within the shared thread budget
+                stats = self.analyze_segments_parallel(video_path, segments)[0]
+            else:
+                stats = self.analyze_range(video_path, total_frames=total_frames)
+            
+            if stats['total_analyzed_frames'] > 0:
+                analysis_result = self.build_analysis_result(stats, fps, total_frames, duration, len(segments))
+                analysis_result['analysis_proxy'] = None if proxy is None else {
+                    'width': proxy['width'],
+                    'height': proxy['height'],
+                    'frames': proxy['proxy_frames'],
+                    'source_resolution': f"{proxy['source_width']}x{proxy['source_height']}"
+                }
+                if question_timings:
+                    analysis_result['question_breakdown'] = self.question_breakdown(stats, question_timings, duration)
+                if budget_plan is not None:
+                    analysis_result['time_budget'] = self.summarize_time_budget(budget_plan, stats, total_frames, started)
+                self.save_analysis(analysis_result, stats, output_dir)
+                
+                print(f"Optimized analysis completed: Score {analysis_result['cheating_score']:.2f}, Cheating: {analysis_result['is_cheating_detected']}")
+                return analysis_result
+            else:
+                raise Exception("No frames could be analyzed")
+                
+        except Exception as e:
+            print(f"Error in optimized eye tracking analysis: {e}")
+            return {
+                'error': str(e),
+                'is_cheating_detected': False,
+                'cheating_score': 0,
+                'video_duration': 0,
+                'total_frames_analyzed': 0,
+                'analysis_timestamp': datetime.now().isoformat()
+            }
+    
+    def build_analysis_result(self, stats, fps, total_frames, duration, segment_count=1):
+        """Turn raw counters into the eye_analysis.json report"""
+        total_analyzed_frames = stats['total_analyzed_frames']
+        looking_away_frames = stats['looking_away_frames']
+        no_face_frames = stats['no_face_frames']
+        movements = stats['movements']
+        
+        # Calculate metrics
+        looking_away_percentage = (looking_away_frames / total_analyzed_frames) * 100
+        no_face_percentage = (no_face_frames / total_analyzed_frames) * 100
+        
+        # Enhanced scoring logic for 24 FPS (weights shared with the timeline re-scoring)
+        cheating_score, is_cheating = compute_cheating_score(
+            looking_away_percentage, no_face_percentage, movements.suspicious_count)
+        
+        optimization_notes = f'Frame skip: {self.analysis_frame_skip}, Effective analysis rate: {fps/self.analysis_frame_skip:.1f} FPS, Sampling: {self.sampling_mode}, Source: {self.frame_source}'
+        if segment_count > 1:
+            optimization_notes += f', Parallel segments: {segment_count}'
+        
+        # Generate analysis report
+        return {
+            'video_duration': duration,
+            'video_fps': fps,
+            'analysis_fps': fps / self.analysis_frame_skip,
+            'total_frames': total_frames,
+            'total_frames_analyzed': total_analyzed_frames,
+            'looking_away_frames': looking_away_frames,
+            'no_face_frames': no_face_frames,
+            'looking_away_percentage': looking_away_percentage,
+            'no_face_percentage': no_face_percentage,
+            'cheating_score': cheating_score,
+            'is_cheating_detected': is_cheating,
+            'suspicious_movements': movements.top_events(),  # Most severe first
+            'total_suspicious_movements': movements.suspicious_count,
+            'movement_histograms': movements.histograms(),
+            'analysis_timestamp': datetime.now().isoformat(),
+            'analysis_method': f'OpenCV {DETECTOR_BACKENDS[self.detector_name].label} (24 FPS Optimized)',
+            'detector': self.detector_name,
+            'analysis_segments': segment_count,
+            'sampling_mode': self.sampling_mode,
+            'frame_source': self.frame_source,
+            'face_localization': self.summarize_face_localization(stats),
+            'adaptive_sampling': self.summarize_adaptive_sampling(stats, duration),
+            'pipeline': self.summarize_pipeline(stats),
+            'coarse_to_fine': self.summarize_coarse_to_fine(stats, fps),
+            'timeline_file': TIMELINE_FILENAME,
+            'timeline_frames': len(stats['timeline']),
+            'optimization_notes': optimization_notes
+        }
+    
+    def question_breakdown(self, stats, question_timings, duration):
+        """Per-question integrity scores computed from the range's timeline"""
+        return question_breakdown(stats['timeline'].to_array(), question_windows(question_timings, duration))
+    
+    def summarize_face_localization(self, stats):
+        """Report how faces were localized and what each analyzed frame cost"""
+        counts = stats['detection_counts']
+        located = counts.get('full_detections', 0) + counts.get('tracked_frames', 0)
+        window_attempts = counts.get('window_attempts', 0)
+        return {
+            'face_tracking': self.face_tracking,
+            'search_window': self.search_window,
+            'full_detections': counts.get('full_detections', 0),
+            'tracked_frames': counts.get('tracked_frames', 0),
+            'tracked_percentage': (counts.get('tracked_frames', 0) / located) * 100 if located else 0,
+            'window_attempts': window_attempts,
+            'window_hits': counts.get('window_hits', 0),
+            'window_hit_rate': (counts.get('window_hits', 0) / window_attempts) * 100 if window_attempts else 0,
+            'avg_frame_latency_ms': (stats['frame_analysis_seconds'] / stats['full_analyses']) * 1000 if stats['full_analyses'] else 0
+        }
+    
+    def summarize_coarse_to_fine(self, stats, fps):
+        """Report how much of the video the dense pass covered"""
+        passes = stats.get('coarse_to_fine')
+        if passes is None:
+            return {'enabled': False, 'dense_percentage': 100}
+        return {
+            'enabled': True,
+            'coarse_interval_seconds': self.analysis_frame_skip * self.coarse_factor / fps if fps > 0 else 0,
+            'coarse_frames': passes['coarse_frames'],
+            'flagged_coarse_frames': passes['flagged_coarse_frames'],
+            'fine_windows': passes['fine_windows'],
+            'dense_seconds': passes['dense_frames'] / fps if fps > 0 else 0,
+            'dense_percentage': (passes['dense_frames'] / passes['total_frames']) * 100 if passes['total_frames'] else 0
+        }
+    
+    def summarize_pipeline(self, stats):
+        """Report queue depth and how busy each pipeline stage was"""
+        timing = stats['pipeline']
+        wall = timing['wall_seconds']
+        threads = timing['detection_threads']
+        return {
+            'enabled': self.pipeline_threads > 0,
+            'detection_threads': threads,
+            'queue_size': self.pipeline_queue_size,
+            'avg_queue_depth': timing['queue_depth_total'] / timing['queue_samples'] if timing['queue_samples'] else 0,
+            'max_queue_depth': timing['max_queue_depth'],
+            'decode_utilization': (timing['decode_seconds'] / wall) * 100 if wall else 0,
+            'detection_utilization': (timing['detection_seconds'] / (wall * threads)) * 100 if wall and threads else 0,
+            'reassembly_utilization': (timing['reassembly_seconds'] / wall) * 100 if wall else 0
+        }
+    
+    def summarize_adaptive_sampling(self, stats, duration):
+        """Report how many sampled frames got the full analysis and the resulting rate"""
+        total_analyzed_frames = stats['total_analyzed_frames']
+        full_analyses = stats['full_analyses']
+        return {
+            'enabled': self.adaptive_sampling,
+            'full_analyses': full_analyses,
+            'inferred_frames': total_analyzed_frames - full_analyses,
+            'full_analysis_percentage': (full_analyses / total_analyzed_frames) * 100 if total_analyzed_frames else 0,
+            'effective_analysis_fps': full_analyses / duration if duration > 0 else 0
+        }
+    
+    def save_analysis(self, analysis_result, stats, output_dir):
+        """Write eye_analysis.json, detailed_eye_analysis.json and the text report"""
+        duration = analysis_result['video_duration']
+        fps = analysis_result['video_fps']
+        suspicious_movements = analysis_result['suspicious_movements']
+        
+        # Save optimized detailed analysis
+        detailed_analysis_file = os.path.join(output_dir, 'detailed_eye_analysis.json')
+        with open(detailed_analysis_file, 'w') as f:
+            json.dump({
+                'summary': analysis_result,
+                'frame_samples': list(stats['detailed_analysis'])  # Last 50 samples for debugging
+            }, f, indent=2)
+        
+        # Save analysis results
+        analysis_file = os.path.join(output_dir, 'eye_analysis.json')
+        with open(analysis_file, 'w') as f:
+            json.dump(analysis_result, f, indent=2)
+        
+        # Save the full per-frame timeline (columnar, memory-mappable)
+        stats['timeline'].save(os.path.join(output_dir, TIMELINE_FILENAME))
+        
+        # Create human-readable report
+        report_file = os.path.join(output_dir, 'cheating_analysis.txt')
+        with open(report_file, 'w') as f:
+            f.write("OPTIMIZED OPENCV EYE TRACKING ANALYSIS REPORT\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Video Duration: {duration:.2f} seconds\n")
+            f.write(f"Video FPS: {fps:.2f}\n")
+            f.write(f"Analysis FPS: {fps/self.analysis_frame_skip:.2f} (optimized)\n")
+            f.write(f"Total Frames: {analysis_result['total_frames']}\n")
+            f.write(f"Frames Analyzed: {analysis_result['total_frames_analyzed']}\n")
+            f.write(f"Analysis Method: {analysis_result['analysis_method']}\n\n")
+            
+            f.write("BEHAVIORAL ANALYSIS:\n")
+            f.write("-" * 25 + "\n")
+            f.write(f"Looking Away Percentage: {analysis_result['looking_away_percentage']:.2f}%\n")
+            f.write(f"No Face Detection: {analysis_result['no_face_percentage']:.2f}%\n")
+            f.write(f"Suspicious Movements: {analysis_result['total_suspicious_movements']}\n")
+            f.write(f"Cheating Score: {analysis_result['cheating_score']:.2f}/100\n")
+            f.write(f"Cheating Detected: {'YES' if analysis_result['is_cheating_detected'] else 'NO'}\n\n")
+            
+            f.write("OPTIMIZATION DETAILS:\n")
+            f.write("-" * 25 + "\n")
+            f.write(f"Frame Skip Rate: {self.analysis_frame_skip}\n")
+            f.write(f"Effective Analysis Rate: {fps/self.analysis_frame_skip:.1f} FPS\n")
+            f.write(f"Performance Gain: ~{self.analysis_frame_skip}x faster processing\n")
+            f.write(f"Parallel Segments: {analysis_result['analysis_segments']}\n\n")
+            
+            if suspicious_movements:
+                f.write("TOP SUSPICIOUS MOMENTS:\n")
+                f.write("-" * 25 + "\n")
+                for i, movement in enumerate(suspicious_movements[:10]):
+                    f.write(f"{i+1}. Time: {movement['timestamp']:.2f}s - ")
+                    if movement['faces_detected'] == 0:
+                        f.write("Face not detected\n")
+                    else:
+                        f.write(f"Movement detected (Face: {movement['face_movement']:.1f}px, Eyes: {movement['eye_movement']:.1f}px)\n")
+            
+            f.write(f"\nANALYSIS COMPLETED: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
@@ -0,0 +1,100 @@
+# Long-lived pool of warm eye analysis workers
+#
+# Without the pool every interview builds its own tracker (reloading the cascade
+# files) and every parallel analysis spawns fresh processes, each letting OpenCV
+# start a thread per core. The pool's worker processes start once, run OpenCV with
+# a fixed thread budget and keep one tracker per distinct setting, so detectors are
+# loaded once per worker and concurrent interviews share processes * opencv_threads
+# cores instead of oversubscribing the CPU.
+import os
+import json
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from eye_tracking import OptimizedEyeTracker
+
+_warm_trackers = {}  # Settings (JSON) -> tracker of this worker process
+
+
+def _init_worker(opencv_threads):
+    """Worker initializer: fixed OpenCV thread budget for the life of the process"""
+    cv2.setNumThreads(opencv_threads)
+
+
+def _warm_tracker(settings):
+    """Tracker for the settings, built on first use in this worker and reset for reuse after"""
+    key = json.dumps(settings, sort_keys=True)
+    tracker = _warm_trackers.get(key)
+    if tracker is None:
+        tracker = OptimizedEyeTracker(**settings)
+        _warm_trackers[key] = tracker
+    else:
+        tracker.reset_for_job()
+    return tracker
+
+
+def _warm_up(settings):
+    _warm_tracker(settings)
+    return os.getpid()
+
+
+def _analyze_range(video_path, start_frame, end_frame, settings, time_limit=None):
+    """Pool job: analyze one frame range with the worker's warm tracker
+    
+    time_limit (seconds) counts from when the job starts, so time spent queued is not lost.
+    """
+    tracker = _warm_tracker(settings)
+    tracker.deadline = time.time() + time_limit if time_limit is not None else None
+    return tracker.analyze_range(video_path, start_frame, end_frame)
+
+
+def _calibrate(video_path, settings, names, widths):
+    """Pool job: time budget calibration with the worker's warm detectors"""
+    return _warm_tracker(settings).calibrate_detectors(video_path, names, widths)
+
+
+class EyeWorkerPool:
+    """Process pool that runs eye analysis frame ranges on warm trackers"""
+
+    def __init__(self, processes=None, opencv_threads=1):
+        self.processes = processes or os.cpu_count() or 1
+        self.opencv_threads = opencv_threads
+        self.lock = threading.Lock()
+        self.executor = self.create_executor()
+
+    def create_executor(self):
+        # Spawned workers only import the tracker modules, not the Flask app
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=context,
+                                   initializer=_init_worker, initargs=(self.opencv_threads,))
+
+    def submit(self, function, *args):
+        with self.lock:
+            try:
+                return self.executor.submit(function, *args)
+            except BrokenProcessPool:
+                # A crashed worker breaks the whole executor; start a fresh one
+                print("Eye worker pool broken, restarting it")
+                self.executor = self.create_executor()
+                return self.executor.submit(function, *args)
+
+    def submit_range(self, video_path, start_frame, end_frame, settings, time_limit=None):
+        """Queue one frame range; the future resolves to the range counters of analyze_range"""
+        return self.submit(_analyze_range, video_path, start_frame, end_frame, settings, time_limit)
+
+    def submit_calibration(self, video_path, settings, names, widths):
+        """Queue a time budget calibration; resolves to the result of calibrate_detectors"""
+        return self.submit(_calibrate, video_path, settings, names, widths)
+    
+    def warm_up(self, settings):
+        """Start the workers and build their trackers ahead of the first interview"""
+        futures = [self.submit(_warm_up, settings) for _ in range(self.processes)]
+        return sorted({future.result() for future in futures})
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
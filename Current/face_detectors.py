@@ -0,0 +1,162 @@
+# Face/eye detector backends for the eye tracker
+# Every backend takes gray analysis frames and returns (x, y, w, h) boxes in that
+# frame's coordinates, so the tracker's movement logic does not depend on the backend.
+import os
+
+import cv2
+import numpy as np
+
+# Local model files for the non-Haar backends (not shipped with opencv-python)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+LBP_FACE_MODEL = 'lbpcascade_frontalface_improved.xml'
+YUNET_MODEL = 'face_detection_yunet_2023mar.onnx'
+RES10_CONFIG = 'deploy.prototxt'
+RES10_MODEL = 'res10_300x300_ssd_iter_140000.caffemodel'
+
+
+def model_path(model_dir, filename):
+    """Path of a local model file, with a clear error when it is missing"""
+    path = os.path.join(model_dir or MODEL_DIR, filename)
+    if not os.path.exists(path):
+        raise Exception(f"Detector model file not found: {path}")
+    return path
+
+
+def filter_by_size(faces, min_size, max_size):
+    """Keep boxes within the cascade-style size limits"""
+    kept = []
+    for x, y, w, h in faces:
+        if w < min_size[0] or h < min_size[1]:
+            continue
+        if max_size is not None and (w > max_size[0] or h > max_size[1]):
+            continue
+        kept.append((x, y, w, h))
+    return kept
+
+
+class CascadeDetector:
+    """Face detection with an OpenCV cascade, eyes with the Haar eye cascade"""
+
+    name = 'cascade'
+    label = 'Cascade'
+
+    def __init__(self, face_model_path):
+        self.face_cascade = cv2.CascadeClassifier(face_model_path)
+        if self.face_cascade.empty():
+            raise Exception(f"Could not load face cascade: {face_model_path}")
+        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+    def detect_faces(self, gray, min_size=(60, 60), max_size=None):
+        """Find faces in a gray frame"""
+        return self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.15,
+            minNeighbors=4,
+            minSize=min_size,  # Larger minimum for performance
+            maxSize=max_size or (0, 0),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+
+    def detect_eyes(self, face_roi):
+        """Detect eyes within a face region - optimized for performance"""
+        return self.eye_cascade.detectMultiScale(
+            face_roi,
+            scaleFactor=1.15,  # Slightly larger steps for performance
+            minNeighbors=4,    # Reduced for faster detection
+            minSize=(12, 12),  # Slightly larger minimum
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+
+
+class HaarDetector(CascadeDetector):
+    """Default Haar cascades bundled with OpenCV"""
+
+    name = 'haar'
+    label = 'Haar Cascades'
+
+    def __init__(self, model_dir=None):
+        super().__init__(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+
+class LBPDetector(CascadeDetector):
+    """LBP face cascade - faster than Haar at some cost in recall"""
+
+    name = 'lbp'
+    label = 'LBP Cascade'
+
+    def __init__(self, model_dir=None):
+        super().__init__(model_path(model_dir, LBP_FACE_MODEL))
+
+
+class YuNetDetector(CascadeDetector):
+    """OpenCV's YuNet CNN face detector (CPU), eyes still from the Haar eye cascade"""
+
+    name = 'yunet'
+    label = 'YuNet DNN'
+
+    def __init__(self, model_dir=None, score_threshold=0.8):
+        self.face_net = cv2.FaceDetectorYN.create(model_path(model_dir, YUNET_MODEL), '', (320, 320),
+                                                  score_threshold)
+        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+    def detect_faces(self, gray, min_size=(60, 60), max_size=None):
+        height, width = gray.shape[:2]
+        self.face_net.setInputSize((width, height))
+        _, detections = self.face_net.detect(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+        if detections is None:
+            return []
+        faces = []
+        for row in detections:
+            # Boxes of faces at the border extend past the frame; clip them to it
+            x, y, w, h = (int(v) for v in row[:4])
+            x1, y1 = max(0, x), max(0, y)
+            x2, y2 = min(width, x + w), min(height, y + h)
+            if x2 > x1 and y2 > y1:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return filter_by_size(faces, min_size, max_size)
+
+
+class Res10Detector(CascadeDetector):
+    """OpenCV DNN res10 SSD face detector (CPU), eyes still from the Haar eye cascade"""
+
+    name = 'res10'
+    label = 'res10 SSD DNN'
+
+    def __init__(self, model_dir=None, confidence_threshold=0.5):
+        self.face_net = cv2.dnn.readNetFromCaffe(model_path(model_dir, RES10_CONFIG),
+                                                 model_path(model_dir, RES10_MODEL))
+        self.confidence_threshold = confidence_threshold
+        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+    def detect_faces(self, gray, min_size=(60, 60), max_size=None):
+        height, width = gray.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), 1.0, (300, 300),
+                                     (104.0, 177.0, 123.0))
+        self.face_net.setInput(blob)
+        detections = self.face_net.forward()
+
+        faces = []
+        for detection in detections[0, 0]:
+            if detection[2] < self.confidence_threshold:
+                continue
+            x1, y1, x2, y2 = (detection[3:7] * np.array([width, height, width, height])).astype(int)
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 > x1 and y2 > y1:
+                faces.append((x1, y1, x2 - x1, y2 - y1))
+        return filter_by_size(faces, min_size, max_size)
+
+
+DETECTOR_BACKENDS = {
+    'haar': HaarDetector,
+    'lbp': LBPDetector,
+    'yunet': YuNetDetector,
+    'res10': Res10Detector
+}
+
+
+def create_detector(name='haar', model_dir=None):
+    """Instantiate a detector backend by name"""
+    if name not in DETECTOR_BACKENDS:
+        raise Exception(f"Unknown detector backend: {name} (available: {', '.join(DETECTOR_BACKENDS)})")
+    return DETECTOR_BACKENDS[name](model_dir)
@@ -0,0 +1,258 @@
+# Frame sources for the eye tracker
+# Each source yields (frame_number, frame, scale_factor) for the sampled frames of a
+# frame range. frame_number is the global 1-based frame count; scale_factor is None
+# when the frame still has to be resized by the tracker, otherwise the factor that
+# was already applied to the original resolution.
+import subprocess
+
+import cv2
+import numpy as np
+
+from recording_index import frame_time
+
+
+def probe_video(video_path):
+    """Get (width, height, fps, total_frames) of a video using OpenCV"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception("Could not open video file")
+    try:
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    return width, height, fps, total_frames
+
+
+def analysis_size(width, height, max_width=640):
+    """Size and scale factor the tracker analyzes a frame at (same rounding as cv2.resize path)"""
+    if width > max_width:
+        scale_factor = max_width / width
+        return int(width * scale_factor), int(height * scale_factor), scale_factor
+    return width, height, 1.0
+
+
+class OpenCVFrameSource:
+    """Decode with cv2.VideoCapture; skipped frames are grabbed or fully read"""
+
+    def __init__(self, video_path, frame_skip=3, start_frame=0, end_frame=None, sampling_mode='grab'):
+        self.video_path = video_path
+        self.frame_skip = frame_skip
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.sampling_mode = sampling_mode
+        self.last_frame = start_frame
+
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise Exception("Could not open video file")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+
+    def __iter__(self):
+        cap = self.cap
+        frame_count = self.start_frame
+        if frame_count > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+
+        while self.end_frame is None or frame_count < self.end_frame:
+            sampled = (frame_count + 1) % self.frame_skip == 0
+
+            if self.sampling_mode == 'grab' and not sampled:
+                # Skipped frames are only grabbed - no BGR conversion or copy to Python
+                if not cap.grab():
+                    break
+                frame_count += 1
+                self.last_frame = frame_count
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame_count += 1
+            self.last_frame = frame_count
+
+            if sampled:
+                yield frame_count, frame, None
+
+    def close(self):
+        self.cap.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FFmpegGrayFrameSource:
+    """Decode with an ffmpeg subprocess that outputs already decimated, scaled grayscale frames
+
+    Frame selection, scaling and the gray conversion all happen inside ffmpeg, so only
+    the analyzed frames cross the pipe and they arrive at 1 byte per pixel at the
+    analysis resolution. Each frame is wrapped with np.frombuffer without copying.
+    """
+
+    def __init__(self, video_path, frame_skip=3, start_frame=0, end_frame=None, max_width=640, ffmpeg_bin='ffmpeg',
+                 start_time=None):
+        self.video_path = video_path
+        self.frame_skip = frame_skip
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.start_time = start_time  # Exact timestamp of start_frame when known (frame index)
+        self.last_frame = start_frame
+        self.process = None
+
+        width, height, self.fps, _ = probe_video(video_path)
+        if width <= 0 or height <= 0:
+            raise Exception("Could not determine video resolution")
+        self.width, self.height, self.scale_factor = analysis_size(width, height, max_width)
+        self.frame_size = self.width * self.height
+
+        self.command = self.build_command(ffmpeg_bin)
+
+    def build_command(self, ffmpeg_bin):
+        """ffmpeg command line for the requested frame range"""
+        # Keep the same sampling grid as the OpenCV path: global frame number
+        # (start_frame + n + 1) must be a multiple of frame_skip
+        phase = (self.frame_skip - 1 - self.start_frame) % self.frame_skip
+        filters = [
+            f"select='eq(mod(n\\,{self.frame_skip})\\,{phase})'",
+            f"scale={self.width}:{self.height}:flags=bilinear",
+            "format=gray"
+        ]
+
+        command = [ffmpeg_bin, '-nostdin', '-loglevel', 'error']
+        start_time = self.start_time
+        if start_time is None and self.fps > 0:
+            start_time = self.start_frame / self.fps
+        if self.start_frame > 0 and start_time is not None:
+            # Half a millisecond early so rounding (millisecond pts in MediaRecorder webm,
+            # or the nominal rate without an index) never drops the start frame itself
+            command += ['-ss', f"{max(0.0, start_time - 0.0005):.6f}"]
+        command += ['-i', self.video_path, '-an', '-sn', '-vf', ','.join(filters), '-vsync', '0']
+
+        if self.end_frame is not None:
+            sampled_frames = self.end_frame // self.frame_skip - self.start_frame // self.frame_skip
+            command += ['-frames:v', str(max(0, sampled_frames))]
+
+        command += ['-f', 'rawvideo', '-pix_fmt', 'gray', 'pipe:1']
+        return command
+
+    def read_frame(self):
+        """Read one raw frame from the pipe; returns None at end of stream"""
+        buffer = bytearray(self.frame_size)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < self.frame_size:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return None
+            filled += count
+        # Writable, zero-copy view over the freshly read buffer
+        return np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width)
+
+    def __iter__(self):
+        try:
+            self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                            bufsize=self.frame_size)
+        except FileNotFoundError:
+            raise Exception("ffmpeg not found - install ffmpeg or use the OpenCV frame source")
+
+        # First sampled global frame number in this range
+        frame_count = (self.start_frame // self.frame_skip + 1) * self.frame_skip
+        while True:
+            gray = self.read_frame()
+            if gray is None:
+                break
+            self.last_frame = frame_count
+            yield frame_count, gray, self.scale_factor
+            frame_count += self.frame_skip
+
+    def close(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.stdout.close()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProxyFrameSource:
+    """Frames of an analysis proxy (see analysis_proxy.py), numbered like the original recording
+
+    The proxy only holds the sampled frames, already at analysis size, so every proxy
+    frame is analyzed. Frame numbers, fps and the scale factor refer to the original,
+    keeping timestamps and pixel movement thresholds unchanged. frame_skip > 1
+    reads only every frame_skip-th proxy frame.
+    """
+
+    def __init__(self, info, start_frame=0, end_frame=None, decoder='opencv', frame_skip=1):
+        self.frame_step = info['frame_step']
+        self.fps = info['source_fps']
+        self.scale_factor = info['scale_factor']
+        self.last_frame = start_frame
+
+        # Proxy frame n holds source frame number (n + 1) * frame_step
+        proxy_start = start_frame // self.frame_step
+        proxy_end = None if end_frame is None else end_frame // self.frame_step
+        if decoder == 'ffmpeg':
+            self.source = FFmpegGrayFrameSource(info['path'], frame_skip, proxy_start, proxy_end, max_width=info['width'])
+        else:
+            self.source = OpenCVFrameSource(info['path'], frame_skip, proxy_start, proxy_end)
+
+    def __iter__(self):
+        for proxy_frame, frame, _ in self.source:
+            frame_count = proxy_frame * self.frame_step
+            self.last_frame = frame_count
+            yield frame_count, frame, self.scale_factor
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class IndexedFrameSource:
+    """Frames of the seekable copy of a recording (see recording_index.py)
+
+    The frame index supplies the real frame rate, and the ffmpeg decoder seeks to
+    the exact timestamp of the first frame of the range. OpenCV seeks by frame
+    number, which the cues of the copy make a single seek.
+    """
+
+    def __init__(self, info, frame_skip=3, start_frame=0, end_frame=None, decoder='opencv', sampling_mode='grab'):
+        if decoder == 'ffmpeg':
+            self.source = FFmpegGrayFrameSource(info['path'], frame_skip, start_frame, end_frame,
+                                                start_time=frame_time(info, start_frame))
+        else:
+            self.source = OpenCVFrameSource(info['path'], frame_skip, start_frame, end_frame, sampling_mode)
+        self.fps = info['fps']
+
+    @property
+    def last_frame(self):
+        return self.source.last_frame
+
+    def __iter__(self):
+        return iter(self.source)
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
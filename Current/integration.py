@@ -2,76 +2,136 @@
 import os
 import json
 import threading
+import numpy as np
 from datetime import datetime
 
 # Import audio processing functions
 from AudioDecoding.analysis_audio import (
-    normalize_format, reduce_noise, trim_silence, 
-    chunk_audio, aggregate_verbal
+    preprocess_audio, trim_silence_array, chunk_audio_array, aggregate_verbal,
+    score_relevance, score_clarity, count_fillers, speech_rate_wpm
 )
-from AudioDecoding.diarize import diarize_audio, extract_segments, transcribe_speaker_chunks
+from AudioDecoding.diarize import diarize_audio, extract_segment_arrays, transcribe_speaker_chunks
+from AudioDecoding.model_registry import asr_models
+from analysis_cache import recording_cache_key
+from eye_scoring import question_windows
+
+# Bump when a change alters the audio analysis output, so cached results are not reused
+AUDIO_ANALYSIS_VERSION = 3
+AUDIO_RESULT_FILES = ['audio_analysis.json']
 
 class AudioProcessor:
     """Audio processing handler for interview recordings"""
     
-    def __init__(self, audio_path, output_dir, hf_token):
+    def __init__(self, audio_path, output_dir, hf_token, keep_intermediate=False,
+                 question_timings=None, segmentation='timings', model_size='base'):
         self.audio_path = audio_path
         self.output_dir = output_dir
         self.hf_token = hf_token
+        self.keep_intermediate = keep_intermediate  # Also write the _norm/_den/_trim WAVs for debugging
+        self.question_timings = question_timings or []
+        # 'timings': answer windows from question_timings (single candidate, no diarization)
+        # 'diarization': pyannote speaker turns, for multi-speaker recordings
+        self.segmentation = segmentation
+        self.model_size = model_size  # Whisper model size used for every transcription
         self.results = None
         
+    def uses_timings(self):
+        return self.segmentation == 'timings' and len(self.question_timings) > 0
+        
+    def segment_by_timings(self, y, sr, model_size="base"):
+        """Transcribe each question's answer window; returns (answers, trimmed speech of all answers)
+        
+        The audio starts with the interview, so timeFromStart is a position in the buffer.
+        """
+        answers, speech = [], []
+        for window in question_windows(self.question_timings, len(y) / sr):
+            audio = trim_silence_array(y[int(window['start_time'] * sr):int(window['end_time'] * sr)], sr)
+            transcript = ""
+            if len(audio) > 0:
+                try:
+                    transcript = asr_models.transcribe(model_size, audio, fp16=False)["text"].strip()
+                except Exception as e:
+                    print(f"[ERROR] Whisper failed on question {window['question_index']}: {e}")
+            speech_seconds = len(audio) / sr
+            answers.append(dict(window, **{
+                'speech_seconds': round(speech_seconds, 2),
+                'transcript': transcript,
+                'relevance': score_relevance(window['question'], transcript),
+                'clarity': score_clarity(transcript),
+                'fillers': count_fillers(transcript),
+                'rate_wpm': speech_rate_wpm(transcript, speech_seconds)
+            }))
+            speech.append(audio)
+        return answers, np.concatenate(speech) if speech else y[:0]
+        
+    def segment_by_diarization(self, y, sr):
+        """Transcripts per diarized speaker; returns (speaker transcripts, question, answer)"""
+        print("Performing speaker diarization...")
+        segments = diarize_audio(y, self.hf_token, sr)
+        speaker_chunks = extract_segment_arrays(y, sr, segments)
+        
+        print("Transcribing speaker segments...")
+        speaker_transcripts = transcribe_speaker_chunks(speaker_chunks, self.model_size)
+        
+        # Determine question and answer
+        sorted_speakers = sorted(speaker_transcripts.keys())
+        question, answer = "", ""
+        
+        if len(sorted_speakers) >= 2:
+            question = speaker_transcripts[sorted_speakers[0]]
+            answer = speaker_transcripts[sorted_speakers[1]]
+        elif len(sorted_speakers) == 1:
+            answer = speaker_transcripts[sorted_speakers[0]]
+        return speaker_transcripts, question, answer
+        
     def process(self):
         """Process audio file through entire pipeline"""
         try:
-            # 1. Preprocessing
+            # 1. Preprocessing (in memory; no audio is written unless debugging)
             print(f"Starting audio processing for: {self.audio_path}")
-            norm_path = self.audio_path.replace('.wav', '_norm.wav')
-            normalize_format(self.audio_path, norm_path)
-            
-            den_path = norm_path.replace('_norm.wav', '_den.wav')
-            reduce_noise(norm_path, den_path)
-            
-            trim_path = den_path.replace('_den.wav', '_trim.wav')
-            trim_silence(den_path, trim_path)
-            
-            # 2. Speaker diarization
-            print("Performing speaker diarization...")
-            segments = diarize_audio(trim_path, self.hf_token)
-            speaker_chunks = extract_segments(trim_path, segments)
-            
-            # 3. Transcription
-            print("Transcribing speaker segments...")
-            speaker_transcripts = transcribe_speaker_chunks(speaker_chunks)
-            
-            # 4. Get metrics
+            base_path = self.audio_path.replace('.wav', '')
+            by_timings = self.uses_timings()
+            # Answer windows are cut at recording times, so silence is trimmed per window
+            y, sr, duration = preprocess_audio(
+                self.audio_path, debug_prefix=base_path if self.keep_intermediate else None,
+                trim=not by_timings)
+            
+            # 2./3. Segmentation and transcription
+            answers = None
+            if by_timings:
+                print("Transcribing answers by question timings...")
+                answers, y = self.segment_by_timings(y, sr, self.model_size)
+                duration = len(y) / sr
+                answer = ' '.join(entry['transcript'] for entry in answers if entry['transcript'])
+                question = ' '.join(entry['question'] for entry in answers)
+                speaker_transcripts = {'candidate': answer}
+            
+            else:
+                speaker_transcripts, question, answer = self.segment_by_diarization(y, sr)
+            
+            if self.keep_intermediate:
+                import soundfile as sf
+                sf.write(base_path + '_trim.wav', y, sr)
+            
+            # 4. Get metrics (chunks are views into the trimmed buffer)
             print("Analyzing speech metrics...")
-            chunks_dir = trim_path.replace('.wav', '_chunks')
-            chunks = chunk_audio(trim_path, chunks_dir)
-            
-            import librosa
-            y, sr = librosa.load(trim_path, sr=16000)
-            duration = librosa.get_duration(y=y, sr=sr)
-            
-            # Determine question and answer
-            sorted_speakers = sorted(speaker_transcripts.keys())
-            question, answer = "", ""
-            
-            if len(sorted_speakers) >= 2:
-                question = speaker_transcripts[sorted_speakers[0]]
-                answer = speaker_transcripts[sorted_speakers[1]]
-            elif len(sorted_speakers) == 1:
-                answer = speaker_transcripts[sorted_speakers[0]]
+            chunks = chunk_audio_array(y, sr)
             
             # 5. Get verbal metrics
-            verbal_metrics = aggregate_verbal(question, answer, duration, chunks_dir)
+            verbal_metrics = aggregate_verbal(question, answer, duration, audio_chunks=chunks)
             
             # 6. Save results
             self.results = {
+                'segmentation': 'timings' if by_timings else 'diarization',
                 'transcripts': speaker_transcripts,
                 'metrics': verbal_metrics,
+                'asr_models': asr_models.metrics(),
                 'processing_timestamp': datetime.now().isoformat()
             }
             
+            if answers is not None:
+                self.results['question_answers'] = answers
+            
             # Save to JSON file
             results_path = os.path.join(self.output_dir, 'audio_analysis.json')
             with open(results_path, 'w') as f:
@@ -96,13 +156,24 @@ class AudioProcessor:
                 
             return error_results
 
-def process_audio_async(audio_path, output_dir, hf_token):
+def process_audio_async(audio_path, output_dir, hf_token, keep_intermediate=False,
+                        question_timings=None, segmentation='timings', model_size='base'):
     """Process audio in a background thread"""
-    processor = AudioProcessor(audio_path, output_dir, hf_token)
+    processor = AudioProcessor(audio_path, output_dir, hf_token, keep_intermediate,
+                               question_timings, segmentation, model_size)
     return processor.process()
 
-def run_audio_processing(session_id, username, audio_path, base_dir):
-    """Start audio processing in background thread"""
+def run_audio_processing(session_id, username, audio_path, base_dir, cache=None, keep_intermediate=False,
+                         question_timings=None, segmentation='timings', model_size='base'):
+    """Start audio processing in background thread
+    
+    With an AnalysisCache, a recording whose audio was analyzed before reuses the
+    stored audio_analysis.json. keep_intermediate also writes the normalized,
+    denoised and trimmed WAVs next to the recording. segmentation='timings' transcribes the
+    answer window of every question in question_timings and skips diarization;
+    without timings, or with 'diarization', speakers come from pyannote.
+    model_size is the Whisper model that transcribes the speech.
+    """
     user_dir = os.path.join(base_dir, 'Users', username)
     session_dir = os.path.join(user_dir, 'interview', session_id)
     
@@ -120,7 +191,22 @@ def run_audio_processing(session_id, username, audio_path, base_dir):
     # Start processing in background
     def process_thread():
         try:
-            results = process_audio_async(audio_path, session_dir, hf_token)
+            results = None
+            if cache is not None:
+                key = recording_cache_key('audio', audio_path, AUDIO_ANALYSIS_VERSION, {
+                    'segmentation': segmentation,
+                    'model_size': model_size,
+                    'question_starts': [t.get('timeFromStart', 0) for t in question_timings or []]
+                })
+                results = cache.restore(key, session_dir, 'audio_analysis.json')
+                if results is not None:
+                    print(f"Audio analysis restored from cache for session: {session_id}")
+            
+            if results is None:
+                results = process_audio_async(audio_path, session_dir, hf_token, keep_intermediate,
+                                              question_timings, segmentation, model_size)
+                if cache is not None and 'error' not in results:
+                    cache.store(key, session_dir, AUDIO_RESULT_FILES)
             
             # Update combined analysis file
             analysis_path = os.path.join(user_dir, 'interview_analysis.json')
@@ -0,0 +1,193 @@
+# Incremental eye analysis of an interview while it is still being recorded
+#
+# MediaRecorder chunks are appended to the session's live recording and streamed
+# into one long-running ffmpeg process. ffmpeg decodes the growing webm stream and
+# writes the sampled frames as grayscale YUV4MPEG on its stdout, where a reader
+# thread feeds them to the session's OptimizedEyeTracker as they arrive.
+import os
+import time
+import queue
+import subprocess
+import threading
+from datetime import datetime
+
+import numpy as np
+
+
+class IncrementalEyeAnalysis:
+    """Per-session eye analysis fed by recording chunks as they are uploaded"""
+
+    def __init__(self, session_id, session_dir, tracker, fps=24, ffmpeg_bin='ffmpeg'):
+        self.session_id = session_id
+        self.session_dir = session_dir
+        self.tracker = tracker
+        self.fps = fps  # Requested recording FPS, replaced by the rate in ffmpeg's stream header
+        self.recording_path = os.path.join(session_dir, f"interview_{session_id}_live.webm")
+
+        self.stats = tracker.new_range_stats()
+        self.last_frame = 0
+        self.next_chunk_index = 0
+        self.error = None
+        self.started_at = datetime.now()
+        self.last_activity = time.time()  # Last chunk upload, to stop abandoned sessions
+        self.last_progress = time.time()  # Last analyzed frame, to notice a stalled drain
+
+        self.chunks = queue.Queue()
+        skip = tracker.analysis_frame_skip
+        command = [
+            ffmpeg_bin, '-nostdin', '-loglevel', 'error',
+            '-f', 'webm', '-i', 'pipe:0', '-an', '-sn',
+            # Same sampling grid as the file-based analysis: frame numbers skip, 2*skip, ...
+            '-vf', f"select='eq(mod(n\\,{skip})\\,{skip - 1})',format=gray", '-vsync', '0',
+            '-f', 'yuv4mpegpipe', '-pix_fmt', 'gray', 'pipe:1'
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+
+        # Uploads only enqueue; a writer thread absorbs ffmpeg back-pressure
+        self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+        self.reader = threading.Thread(target=self.read_frames, daemon=True)
+        self.writer.start()
+        self.reader.start()
+
+    def add_chunk(self, chunk_index, data):
+        """Append one recording chunk; chunks must arrive in order"""
+        if self.error:
+            raise Exception(self.error)
+        if chunk_index != self.next_chunk_index:
+            self.fail(f"Expected chunk {self.next_chunk_index}, got {chunk_index}")
+            raise Exception(self.error)
+
+        with open(self.recording_path, 'ab') as f:
+            f.write(data)
+        self.chunks.put(data)
+        self.next_chunk_index += 1
+        self.last_activity = time.time()
+
+    def idle_seconds(self):
+        return time.time() - self.last_activity
+
+    def write_chunks(self):
+        """Forward queued chunks to ffmpeg; None closes its input"""
+        try:
+            while True:
+                data = self.chunks.get()
+                if data is None:
+                    break
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.fail(f"ffmpeg input closed: {e}")
+        finally:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+
+    def read_exactly(self, size):
+        """Read exactly size bytes from ffmpeg into a fresh buffer; None at end of stream"""
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < size:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                return None
+            filled += count
+        return buffer
+
+    def read_frames(self):
+        """Parse the YUV4MPEG stream and analyze frames as they are decoded"""
+        try:
+            header = self.process.stdout.readline()
+            if not header.startswith(b'YUV4MPEG2'):
+                if header:
+                    self.fail("Unexpected ffmpeg output")
+                return
+
+            fields = {field[:1]: field[1:] for field in header.split()[1:]}
+            width, height = int(fields[b'W']), int(fields[b'H'])
+            # Browsers do not hold the requested rate; use the one ffmpeg found in the stream
+            numerator, _, denominator = fields.get(b'F', b'').partition(b':')
+            if numerator.isdigit() and denominator.isdigit() and int(denominator) > 0:
+                rate = int(numerator) / int(denominator)
+                if 1 <= rate <= 120:  # Timebase-like values (e.g. 1000:1) are not frame rates
+                    self.fps = rate
+            frame_size = width * height
+
+            frame_count = 0
+            while True:
+                frame_header = self.process.stdout.readline()
+                if not frame_header.startswith(b'FRAME'):
+                    break
+                buffer = self.read_exactly(frame_size)
+                if buffer is None:
+                    break
+
+                gray = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width)
+                frame_count += self.tracker.analysis_frame_skip
+                self.tracker.analyze_sampled_frame(self.stats, frame_count, gray, None, self.fps)
+                self.last_frame = frame_count
+                self.last_progress = time.time()
+        except Exception as e:
+            self.fail(f"Live analysis failed: {e}")
+
+    def fail(self, message):
+        """Record the first error; the caller falls back to analyzing the full upload"""
+        if self.error is None:
+            self.error = message
+            print(f"Live eye analysis for {self.session_id} disabled: {message}")
+
+    def abort(self):
+        """Stop ffmpeg without producing results and delete the live recording copy"""
+        self.chunks.put(None)
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        # The saved upload is the recording of record; the live copy only fed ffmpeg
+        try:
+            os.remove(self.recording_path)
+        except OSError:
+            pass
+
+    def finish(self, timeout=None, question_timings=None, stall_timeout=None):
+        """Drain the remaining frames and write eye_analysis.json
+
+        Only the chunks not yet decoded still have to be analyzed, so this normally
+        returns within a few seconds of the last chunk. The drain gives up after
+        timeout seconds, or as soon as no frame was analyzed for stall_timeout
+        seconds. Returns None when the live analysis failed and the recording must be
+        analyzed from scratch.
+        """
+        self.chunks.put(None)
+        started = self.last_progress = time.time()
+        while self.reader.is_alive():
+            self.reader.join(1)
+            now = time.time()
+            if timeout is not None and now - started >= timeout:
+                self.fail("Timed out draining live analysis")
+                break
+            if stall_timeout is not None and now - self.last_progress >= stall_timeout:
+                self.fail(f"Live analysis made no progress for {stall_timeout}s")
+                break
+        self.abort()
+
+        if self.error or self.stats['total_analyzed_frames'] == 0:
+            return None
+
+        self.tracker.close_range(self.stats, self.last_frame)
+        total_frames = self.last_frame + self.tracker.analysis_frame_skip - 1
+        duration = total_frames / self.fps
+
+        analysis_result = self.tracker.build_analysis_result(self.stats, self.fps, total_frames, duration)
+        analysis_result['live_analysis'] = {
+            'chunks_received': self.next_chunk_index,
+            'fps': self.fps,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat()
+        }
+        if question_timings:
+            analysis_result['question_breakdown'] = self.tracker.question_breakdown(self.stats, question_timings, duration)
+        self.tracker.save_analysis(analysis_result, self.stats, self.session_dir)
+        print(f"Live analysis completed: Score {analysis_result['cheating_score']:.2f}, Cheating: {analysis_result['is_cheating_detected']}")
+        return analysis_result
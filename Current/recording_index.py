@@ -0,0 +1,160 @@
+# Seekable copy and frame index of uploaded recordings
+#
+# WebM from MediaRecorder has no cues and no duration, so OpenCV reports a bogus
+# frame count and every seek decodes from the start of the file. Right after upload
+# the recording is remuxed (stream copy, no re-encode) into Matroska, which writes
+# cues, and the presentation timestamp and keyframe flag of every video packet are
+# stored next to it as a frame index. The eye tracker takes the frame count and fps
+# from the index and decodes the seekable copy, so a frame range starts with one
+# seek to the exact timestamp instead of a decode from frame 0.
+import os
+import json
+import time
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+SEEKABLE_SUFFIX = '_seekable.mkv'
+INDEX_SUFFIX = '_frame_index.npy'
+INDEX_INFO_SUFFIX = '_frame_index.json'
+
+# One row per video frame in presentation order
+FRAME_INDEX_DTYPE = np.dtype([
+    ('pts', '<f8'),       # Presentation timestamp (s)
+    ('keyframe', '?')
+])
+
+
+def index_paths(video_path):
+    """(seekable copy path, frame index path, index info path) for a recording"""
+    base = os.path.splitext(video_path)[0]
+    return base + SEEKABLE_SUFFIX, base + INDEX_SUFFIX, base + INDEX_INFO_SUFFIX
+
+
+def run_ffmpeg(command, error_message):
+    """Run an ffmpeg command and return its stdout"""
+    try:
+        result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise Exception(f"ffmpeg not found - {error_message}")
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"{error_message}: {e.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def read_frame_index(video_path, ffmpeg_bin='ffmpeg'):
+    """Packet timestamps and keyframe flags of the first video stream, without decoding
+
+    Returns (frame index sorted by pts, end time of the last frame in seconds).
+    framecrc prints one line per packet: stream, dts, pts, duration, size, crc and,
+    for packets that are not keyframes, their flags (F=0x0).
+    """
+    output = run_ffmpeg([
+        ffmpeg_bin, '-nostdin', '-loglevel', 'error', '-i', video_path,
+        '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'
+    ], "cannot index recording")
+
+    time_base = 1 / 1000
+    rows = []
+    end_time = 0.0
+    for line in output.decode(errors='replace').splitlines():
+        if line.startswith('#tb 0:'):
+            numerator, denominator = line.split(':', 1)[1].strip().split('/')
+            time_base = int(numerator) / int(denominator)
+            continue
+        if not line or line.startswith('#'):
+            continue
+        fields = [field.strip() for field in line.split(',')]
+        pts = int(fields[2]) * time_base
+        flags = fields[6] if len(fields) > 6 else ''
+        rows.append((pts, not flags.startswith('F=') or bool(int(flags[2:], 16) & 1)))
+        end_time = max(end_time, pts + int(fields[3]) * time_base)
+
+    index = np.array(rows, dtype=FRAME_INDEX_DTYPE)
+    index.sort(order='pts', kind='stable')
+    return index, end_time
+
+
+def create_recording_index(video_path, ffmpeg_bin='ffmpeg'):
+    """Remux a recording into a seekable copy, index its frames and return the index info"""
+    seekable_path, index_path, info_path = index_paths(video_path)
+
+    start = time.perf_counter()
+    partial_path = seekable_path + '.partial.mkv'
+    try:
+        run_ffmpeg([
+            ffmpeg_bin, '-nostdin', '-loglevel', 'error', '-y', '-i', video_path,
+            '-map', '0', '-c', 'copy', partial_path
+        ], "Remux failed")
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, seekable_path)
+
+    index, end_time = read_frame_index(seekable_path, ffmpeg_bin)
+    if len(index) == 0:
+        raise Exception("Recording has no video frames")
+    np.save(index_path, index)
+
+    duration = end_time - index['pts'][0]
+    info = {
+        'source_file': os.path.basename(video_path),
+        'source_size': os.path.getsize(video_path),
+        'seekable_file': os.path.basename(seekable_path),
+        'index_file': os.path.basename(index_path),
+        'frame_count': int(len(index)),
+        'keyframes': int(np.count_nonzero(index['keyframe'])),
+        'start_time': float(index['pts'][0]),
+        'duration': float(duration),
+        'fps': float(len(index) / duration) if duration > 0 else 0,
+        'remux_seconds': round(time.perf_counter() - start, 2),
+        'created_at': datetime.now().isoformat()
+    }
+    # The info file is written last; an index without it is never used
+    with open(info_path, 'w') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def load_recording_index(video_path, with_frames=True):
+    """Info of a complete, up-to-date index of the recording, else None
+
+    With with_frames=True the frame rows are memory-mapped under 'frames'.
+    """
+    seekable_path, index_path, info_path = index_paths(video_path)
+    if not all(os.path.exists(path) for path in (seekable_path, index_path, info_path)):
+        return None
+    try:
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+        if info.get('source_size') != os.path.getsize(video_path):
+            return None  # A re-uploaded recording invalidates the index
+        if with_frames:
+            info['frames'] = np.load(index_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    info['path'] = seekable_path
+    return info
+
+
+def frame_time(info, frame_number):
+    """Presentation time of the frame preceded by frame_number frames"""
+    frames = info['frames']
+    if frame_number >= len(frames):
+        return info['start_time'] + info['duration']
+    return float(frames['pts'][frame_number])
+
+
+def prepare_recording_index(video_path):
+    """Create the seekable copy and index; failures only disable seeking"""
+    try:
+        info = create_recording_index(video_path)
+        print(f"Recording indexed: {info['frame_count']} frames, {info['duration']:.2f}s, "
+              f"{info['keyframes']} keyframes in {info['remux_seconds']}s")
+        return info
+    except Exception as e:
+        print(f"Recording index not created, analyzing the original: {e}")
+        return None
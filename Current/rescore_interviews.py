@@ -0,0 +1,97 @@
+# Bulk re-scoring of stored interview eye analyses
+#
+# Re-scores every session under Users/*/interview/* from its eye_timeline.npy with
+# new thresholds/weights, in parallel, without decoding any video.
+#
+# Usage (from the Current directory):
+#   python rescore_interviews.py [--users-dir AI-Interviewer/Users] [--set face_movement_threshold=30 ...]
+#       [--workers 8] [--write] [--json results.json]
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from eye_scoring import DEFAULT_SCORING, scoring_params, rescore_session
+
+USERS_FOLDER = os.path.join('AI-Interviewer', 'Users')  # Same location as app.py
+
+
+def find_sessions(users_dir):
+    """Interview session directories, sorted"""
+    return sorted(path for path in glob.glob(os.path.join(users_dir, '*', 'interview', '*'))
+                  if os.path.isdir(path))
+
+
+def parse_overrides(assignments):
+    """Parse name=value scoring overrides"""
+    overrides = {}
+    for assignment in assignments or []:
+        name, _, value = assignment.partition('=')
+        if name not in DEFAULT_SCORING or not value:
+            raise SystemExit(f"Invalid --set {assignment!r} (parameters: {', '.join(DEFAULT_SCORING)})")
+        overrides[name] = float(value)
+    return overrides
+
+
+def _rescore(args):
+    session_dir, params, write = args
+    return rescore_session(session_dir, params, write)
+
+
+def rescore_all(session_dirs, params, write=False, workers=None):
+    """Re-score all sessions in parallel, results in the order of session_dirs"""
+    workers = workers or os.cpu_count() or 1
+    tasks = [(session_dir, params, write) for session_dir in session_dirs]
+    if workers <= 1 or len(tasks) <= 1:
+        return [_rescore(task) for task in tasks]
+
+    # Sessions are small, so hand them out in batches to keep IPC overhead low
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_rescore, tasks, chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score stored interview eye analyses')
+    parser.add_argument('--users-dir', default=USERS_FOLDER, help=f'Users directory (default: {USERS_FOLDER})')
+    parser.add_argument('--set', dest='overrides', action='append', metavar='NAME=VALUE',
+                        help=f"Override a scoring parameter ({', '.join(DEFAULT_SCORING)})")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--write', action='store_true', help='Update eye_analysis.json with the new scores')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this file')
+    args = parser.parse_args()
+
+    params = scoring_params(parse_overrides(args.overrides))
+    session_dirs = find_sessions(args.users_dir)
+    if not session_dirs:
+        print(f"No interview sessions found under {args.users_dir}")
+        return 1
+
+    start = time.perf_counter()
+    results = rescore_all(session_dirs, params, args.write, args.workers)
+    seconds = time.perf_counter() - start
+
+    rescored = [r for r in results if 'error' not in r]
+    flagged = sum(1 for r in rescored if r['is_cheating_detected'])
+    for r in results:
+        name = os.path.relpath(r['session_dir'], args.users_dir)
+        if 'error' in r:
+            print(f"  {name}: skipped - {r['error']}")
+        else:
+            print(f"  {name}: score {r['cheating_score']:6.2f}, "
+                  f"cheating {'YES' if r['is_cheating_detected'] else 'NO'}, "
+                  f"suspicious {r['total_suspicious_movements']}")
+
+    print(f"Re-scored {len(rescored)}/{len(results)} sessions in {seconds:.2f}s, {flagged} flagged")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'params': params, 'sessions': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
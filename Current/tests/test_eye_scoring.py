@@ -0,0 +1,61 @@
+# Top suspicious events: frames without a face compete with movements for the
+# reported slots of MovementAggregator and rescore_timeline
+#
+# Usage (from the Current directory):
+#   python -m pytest tests
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eye_scoring import MovementAggregator, rescore_timeline
+from eye_timeline import TIMELINE_DTYPE
+
+ABSENCE_TIMESTAMPS = (3.0, 11.0, 19.0, 27.0, 35.0)
+
+
+def competing_events():
+    """40 threshold-exceeding movements (30-97 px) with 5 absences among them, one extreme jump last"""
+    events = []
+    for i in range(40):
+        events.append({'timestamp': float(i), 'face_movement': 30.0 + i * 1.75, 'eye_movement': 0.0,
+                       'faces_detected': 1, 'eyes_detected': 2})
+    for timestamp in ABSENCE_TIMESTAMPS:
+        events[int(timestamp)] = {'timestamp': timestamp, 'face_movement': 0.0, 'eye_movement': 0.0,
+                                  'faces_detected': 0, 'eyes_detected': 0}
+    events.append({'timestamp': 40.0, 'face_movement': 250.0, 'eye_movement': 0.0,
+                   'faces_detected': 1, 'eyes_detected': 2})
+    return events
+
+
+def test_aggregator_keeps_absences_among_top_events():
+    aggregator = MovementAggregator(max_events=20)
+    for event in competing_events():
+        aggregator.add_event(event)
+
+    top = aggregator.top_events()
+    assert aggregator.suspicious_count == 41
+    assert len(top) == 20
+    assert top[0]['timestamp'] == 40.0  # A jump far beyond the top band still ranks first
+    absences = sorted(event['timestamp'] for event in top if event['faces_detected'] == 0)
+    assert absences == list(ABSENCE_TIMESTAMPS)
+
+
+def test_rescore_ranks_like_the_aggregator():
+    events = competing_events()
+    timeline = np.zeros(len(events), dtype=TIMELINE_DTYPE)
+    for row, event in zip(timeline, events):
+        row['timestamp'] = event['timestamp']
+        row['faces'] = event['faces_detected']
+        row['eyes'] = event['eyes_detected']
+        row['face_movement'] = event['face_movement']
+        row['eye_movement'] = event['eye_movement']
+
+    aggregator = MovementAggregator(max_events=20)
+    for event in events:
+        aggregator.add_event(event)
+
+    rescored = rescore_timeline(timeline, max_movements=20)['suspicious_movements']
+    assert [event['timestamp'] for event in rescored] == [event['timestamp'] for event in aggregator.top_events()]